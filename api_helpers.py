@@ -1,17 +1,40 @@
 import os
-import requests
 import base64
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
+import cover_cache
+import http_client
+import spotify_lookup
+from http_cache import create_http_cache_table, load_http_cache, save_http_cache, delete_http_cache
+from token_manager import TokenManager
 
 # from dotenv import load_dotenv
 # load_dotenv()
 
+# (connect, read) timeout for cover-art requests, in seconds
+COVER_TIMEOUT = (3.05, 10)
+
+# SerpApi calls are metered, so keep concurrency low (Spotify's limit lives in spotify_lookup)
+SERPAPI_MAX_CONCURRENCY = int(os.getenv("SERPAPI_MAX_CONCURRENCY", "2"))
+_serpapi_limit = threading.BoundedSemaphore(SERPAPI_MAX_CONCURRENCY)
+
+# Spotify client-credentials token, reused until shortly before expiry
+SPOTIFY_TOKEN_REFRESH_MARGIN = 60
+_spotify_token: Dict[str, object] = {}
+_spotify_token_lock = threading.Lock()
+_spotify_token_manager = None
+
 # --- Spotify & Google Images (Cover Art) ---
 
-def get_spotify_bearer() -> Optional[str]:
+def _request_spotify_token() -> Optional[Dict[str, object]]:
     """
-    Obtain a Spotify API Bearer token.
+    Exchange the client credentials for a new Spotify access token.
+    
+    Returns:
+        Dictionary with access_token and expires_at (epoch seconds), or None
     """
     client_id = os.getenv('spotifyClient')
     client_secret = os.getenv('spotifySecret')
@@ -31,10 +54,14 @@ def get_spotify_bearer() -> Optional[str]:
     }
     
     try:
-        response = requests.post(auth_url, headers=headers, data=data)
+        requested_at = time.time()
+        response = http_client.post(auth_url, headers=headers, data=data, timeout=COVER_TIMEOUT)
         if response.status_code == 200:
             token_info = response.json()
-            return token_info['access_token']
+            return {
+                'access_token': token_info['access_token'],
+                'expires_at': requested_at + token_info.get('expires_in', 3600)
+            }
         else:
             print(f"Failed to get Spotify token: {response.status_code}, {response.text}")
             return None
@@ -43,6 +70,59 @@ def get_spotify_bearer() -> Optional[str]:
         return None
 
 
+def _token_is_fresh(tokens: Dict[str, object]) -> bool:
+    """True if the token won't expire within the refresh margin."""
+    return bool(tokens.get('access_token')) and \
+        float(tokens.get('expires_at') or 0) - SPOTIFY_TOKEN_REFRESH_MARGIN > time.time()
+
+
+def get_spotify_bearer(force_refresh: bool = False, stale_token: Optional[str] = None) -> Optional[str]:
+    """
+    Obtain a Spotify API Bearer token.
+    Tokens are reused (in memory, then from the api_tokens table) until shortly
+    before they expire; a new client-credentials exchange happens only then.
+    
+    Args:
+        force_refresh: Skip cached tokens (e.g. after a 401)
+        stale_token: The token that was rejected; if another thread already
+            replaced it, the replacement is returned instead of refreshing again
+    """
+    global _spotify_token_manager
+    
+    with _spotify_token_lock:
+        current = _spotify_token.get('access_token')
+        if force_refresh and stale_token and current and current != stale_token:
+            return current
+        
+        if not force_refresh:
+            if _token_is_fresh(_spotify_token):
+                return current
+            
+            if _spotify_token_manager is None:
+                _spotify_token_manager = TokenManager("spotify")
+            stored = _spotify_token_manager.load_tokens()
+            if _token_is_fresh(stored):
+                _spotify_token.update(stored)
+                return stored['access_token']
+        
+        tokens = _request_spotify_token()
+        if not tokens:
+            _spotify_token.clear()
+            return None
+        
+        _spotify_token.clear()
+        _spotify_token.update(tokens)
+        if _spotify_token_manager is None:
+            _spotify_token_manager = TokenManager("spotify")
+        _spotify_token_manager.save_tokens(tokens)
+        return tokens['access_token']
+
+
+def _refresh_spotify_bearer(stale_token: str) -> Optional[str]:
+    """Replace a token Spotify rejected with a 401."""
+    return get_spotify_bearer(force_refresh=True, stale_token=stale_token)
+
+
 def get_spotify_cover(song: List[str], bearer: str) -> Optional[str]:
     """
     Search for a song cover on Spotify.
@@ -52,41 +132,28 @@ def get_spotify_cover(song: List[str], bearer: str) -> Optional[str]:
     """
     if not bearer:
         return None
-        
-    url = f"https://api.spotify.com/v1/search?q=track:{song[0]}%20artist:{song[1]}&type=track"
-    headers = {
-        'Authorization': f'Bearer {bearer}'
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            if data['tracks']['items']:
-                images = data['tracks']['items'][0]['album']['images']
-                # Try to get the second image (medium size), fall back to first
-                if len(images) > 1:
-                    return images[1]['url']
-                elif len(images) > 0:
-                    return images[0]['url']
-            print(f"No Spotify results found for: {song[0]} by {song[1]}")
-            return None
-        else:
-            print(f"Failed to get Spotify cover: {response.status_code}, {response.text}")
-            return None
-    except Exception as e:
-        print(f"Error searching Spotify: {e}")
-        return None
+    return spotify_lookup.resolve_chart([song], bearer, refresh_bearer=_refresh_spotify_bearer)[0][0]
 
 
 def get_serapi_image(song: List[str]) -> Optional[str]:
     """
     Fallback to Google Images via SerpApi if Spotify fails.
     """
+    return _search_serpapi(song)[0]
+
+
+def _search_serpapi(song: List[str]) -> Tuple[Optional[str], bool]:
+    """
+    Search Google Images via SerpApi.
+    
+    Returns:
+        Tuple of (image_url, confirmed): confirmed is True when SerpApi
+        answered, so a None URL means it really found nothing
+    """
     api_key = os.getenv('google_key')
     if not api_key:
         print("Error: Google/SerpApi key not found.")
-        return None
+        return None, False
 
     params = {
         "engine": "google_images",
@@ -96,52 +163,173 @@ def get_serapi_image(song: List[str]) -> Optional[str]:
     }
     
     try:
-        req = requests.get('https://serpapi.com/search.json', params=params)
+        req = http_client.get('https://serpapi.com/search.json', params=params,
+                              limit=_serpapi_limit, timeout=COVER_TIMEOUT)
         data = req.json()
         
-        if 'images_results' not in data:
-            return None
+        # An empty search comes back as an error too; anything else is a failed request
+        error = data.get('error')
+        if error and "hasn't returned any results" not in error:
+            print(f"SerpApi search failed: {req.status_code}, {error}")
+            return None, False
+        if req.status_code != 200 and not error:
+            print(f"SerpApi search failed: {req.status_code}")
+            return None, False
             
-        image_results = data['images_results']
+        image_results = data.get('images_results') or []
 
         # Prefer Spotify source
         for image in image_results:
             if image.get('source') == 'Spotify':
-                return image['original']
+                return image['original'], True
         
         # Fallback to first result
         if image_results:
-            return image_results[0]['original']
+            return image_results[0]['original'], True
         
-        return None
+        return None, True
     except Exception as e:
         print(f"Error searching SerpApi: {e}")
-        return None
+        return None, False
 
 
 def get_cover_image(song: List[str], bearer: Optional[str]) -> Optional[str]:
     """
-    Get cover image for a song, trying Spotify first then Google Images.
+    Get cover image for a song, consulting the persistent cover cache before
+    trying Spotify then Google Images (see resolve_covers).
+    """
+    return resolve_covers([song], bearer)[0]
+
+
+def resolve_covers(songs: List[List[str]], bearer: Optional[str],
+                   max_workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Resolve cover images for a whole chart concurrently.
+    Cached covers (and cached misses) are read in one query; the rest are
+    resolved on Spotify as one batch, with Google Images as the fallback,
+    and written back in one batch. A miss is only cached when both
+    providers answered; failed requests are retried on the next run.
+    
+    Args:
+        songs: List of [song_name, artist_name]
+        bearer: Spotify access token (None skips straight to Google Images)
+        max_workers: Maximum songs resolved at once (default: one per song, up to 10)
+        
+    Returns:
+        Cover URLs (or None) in the same order as songs
     """
-    image = get_spotify_cover(song, bearer) if bearer else None
+    if not songs:
+        return []
+    
+    covers = cover_cache.lookup_many(songs)
+    pending = {}
+    for song in songs:
+        key = cover_cache.song_key(song)
+        if key not in covers:
+            pending.setdefault(key, song)
+    pending = list(pending.values())
     
-    if image:
-        print(f"Found Spotify cover for {song[0]}")
-    else:
-        print(f"No Spotify image found for {song[0]} by {song[1]}, trying Google...")
-        image = get_serapi_image(song)
+    if pending:
+        spotify_covers = spotify_lookup.resolve_chart(
+            pending, bearer, refresh_bearer=_refresh_spotify_bearer, max_workers=max_workers
+        )
         
-    return image
+        fallback = [song for song, (image, _) in zip(pending, spotify_covers) if not image]
+        for song in fallback:
+            print(f"No Spotify image found for {song[0]} by {song[1]}, trying Google...")
+        google_covers = {}
+        if fallback:
+            workers = max_workers or min(len(fallback), 10)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                google_covers = dict(zip(map(cover_cache.song_key, fallback),
+                                         executor.map(_search_serpapi, fallback)))
+        
+        entries = []
+        for song, (image, confirmed) in zip(pending, spotify_covers):
+            key = cover_cache.song_key(song)
+            source = "spotify" if image else None
+            if not image:
+                image, google_confirmed = google_covers[key]
+                source = "google" if image else None
+                confirmed = confirmed and google_confirmed
+            covers[key] = image
+            # Only remember a miss both providers confirmed, not a failed or skipped request
+            if image or confirmed:
+                entries.append((song, image, source))
+        cover_cache.store_many(entries)
+    
+    print(cover_cache.format_stats())
+    return [covers.get(cover_cache.song_key(song)) for song in songs]
 
 
 # --- GitHub ---
 
+GITHUB_REPOS_URL = 'https://api.github.com/users/Ashwin-Iyer1/repos'
+
+
+def _fetch_github_pages(url: str) -> Optional[List[Dict]]:
+    """
+    Fetch every page of a GitHub list endpoint, following Link rel="next".
+    Each page is requested conditionally with its stored ETag/Last-Modified;
+    a 304 reuses the cached body and costs no transfer.
+    
+    Returns:
+        All items across pages, or None if any page failed
+    """
+    create_http_cache_table()
+    cache = load_http_cache(url)
+    
+    headers = {'Accept': 'application/vnd.github+json'}
+    token = os.getenv('GITHUB_TOKEN')
+    if token:
+        # Authenticated 304s don't count against the rate limit
+        headers['Authorization'] = f'Bearer {token}'
+    
+    items, updated, not_modified = [], [], 0
+    page_url, seen = url, set()
+    while page_url and page_url not in seen:
+        seen.add(page_url)
+        cached = cache.get(page_url)
+        page_headers = dict(headers)
+        if cached and cached.get('etag'):
+            page_headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            page_headers['If-Modified-Since'] = cached['last_modified']
+        
+        response = http_client.get(page_url, headers=page_headers)
+        if response.status_code == 304 and cached:
+            not_modified += 1
+            items.extend(cached['body'])
+            page_url = cached.get('next_url')
+        elif response.status_code == 200:
+            body = response.json()
+            next_url = response.links.get('next', {}).get('url')
+            updated.append({
+                'url': page_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'next_url': next_url,
+                'body': body
+            })
+            items.extend(body)
+            page_url = next_url
+        else:
+            print(f"Failed to fetch GitHub repos: {response.status_code}")
+            return None
+    
+    save_http_cache(updated)
+    # Pages that are no longer part of the chain (e.g. the list got shorter)
+    delete_http_cache([cached_url for cached_url in cache if cached_url not in seen])
+    print(f"GitHub repos: {len(seen)} page(s), {not_modified} not modified")
+    return items
+
+
 def get_github_repos() -> List[Tuple[str, str, str]]:
     """
     Fetch GitHub repositories for user 'Ashwin-Iyer1' and add manual entries.
     Returns a list of tuples: (name, description, html_url)
     """
-    url = 'https://api.github.com/users/Ashwin-Iyer1/repos?per_page=100'
+    url = f'{GITHUB_REPOS_URL}?per_page=100'
     
     # Manual entries
     manual_repos = [
@@ -159,9 +347,8 @@ def get_github_repos() -> List[Tuple[str, str, str]]:
     repo_list = []
     
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        data = _fetch_github_pages(url)
+        if data is not None:
             # Add manual repos to the list
             data.extend(manual_repos)
             
@@ -170,8 +357,6 @@ def get_github_repos() -> List[Tuple[str, str, str]]:
                 description = repo.get('description')
                 html_url = repo.get('html_url')
                 repo_list.append((name, description, html_url))
-        else:
-            print(f"Failed to fetch GitHub repos: {response.status_code}")
             
     except Exception as e:
         print(f"Error fetching GitHub repos: {e}")
@@ -196,7 +381,7 @@ def get_lastfm_top_tracks(num_songs: int = 10) -> List[List[str]]:
     songs_list = []
     
     try:
-        r = requests.get(url)
+        r = http_client.get(url)
         if r.status_code == 200:
             data = r.json()
             tracks = data.get('weeklytrackchart', {}).get('track', [])
@@ -236,7 +421,7 @@ def get_wakatime_stats() -> Optional[Dict]:
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         if response.status_code == 200:
             return response.json()
         else:
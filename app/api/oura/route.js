@@ -15,20 +15,6 @@ export async function GET(request) {
     if (type) {
       conditions.push(`data_type = $${values.length + 1}`);
       values.push(type);
-      
-      // OPTIMIZATION: If requesting heart_rate, limit to last 1 days (24h)
-      // The frontend only needs the last 24h, but we fetch 48h to be safe with timezones/rolling windows.
-      if (type === 'heart_rate') {
-          const oneDayAgo = new Date();
-          oneDayAgo.setDate(oneDayAgo.getDate() - 1);
-          const formattedDate = oneDayAgo.toISOString().split('T')[0]; // YYYY-MM-DD
-          
-          // Override or set startDate
-          // We don't change the `values` array for startDate yet because we handle it below
-          // But we need to make sure we don't double-add if startDate was passed in query
-          // Actually, let's just update the local variable `startDate` which is used below.
-          // BUT `startDate` is a const from searchParams. We need to use a let or a new variable.
-      }
     }
 
     // Use a mutable variable for effective start date
@@ -45,6 +31,26 @@ export async function GET(request) {
        }
     }
 
+    // Heart rate lives in its own narrow table, one row per sample
+    if (type === 'heart_rate') {
+      const hrConditions = ["timestamp >= $1::date"];
+      const hrValues = [effectiveStartDate];
+      if (endDate) {
+        hrConditions.push("timestamp < $2::date + 1");
+        hrValues.push(endDate);
+      }
+      const hrResults = await pool.query(
+        `SELECT bpm, source,
+                to_char(timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"') AS timestamp
+         FROM oura_heart_rate
+         WHERE ${hrConditions.join(" AND ")}
+         ORDER BY oura_heart_rate.timestamp ASC`,
+        hrValues
+      );
+      // Same shape as the Oura API: { data: [{ bpm, source, timestamp }, ...] }
+      return Response.json({ data: hrResults.rows });
+    }
+
     if (effectiveStartDate) {
       conditions.push(`date >= $${values.length + 1}`);
       values.push(effectiveStartDate);
@@ -65,23 +71,7 @@ export async function GET(request) {
 
     // Transform results to match Oura API format { data: [...] }
     // The DB stores each day as a separate row with 'data' column containing the JSON blob.
-    // If the frontend expects a list of these blobs, we can extract them.
-    // However, the DB 'data' column *is* the blob for that day.
-    
-    // If the user requested 'heart_rate' which we stored as a list-per-day, it will come out as a list of days, each with a list of points.
-    // If the frontend expects a flat list of all points (like the raw API for range), we might need to flatten.
-    // But for now, returning the list of row-data is safest.
-    
-    // Actually, to make it seamless for hooks expecting `{data: [...]}` where ... is the list of daily objects:
     const data = results.rows.map(row => row.data);
-    
-    // For heart_rate, we stored `{ data: [...] }` in the column. So mapping row.data gives us `[{data: [...]}, {data: [...]}]`.
-    // The original API for heartrate returns `{ data: [point, point, ...] }`.
-    // So we might want to flatten if it's heart_rate.
-    if (type === 'heart_rate') {
-        const flattened = data.flatMap(d => d.data || []);
-        return Response.json({ data: flattened });
-    }
 
     return Response.json({ data });
   } catch (error) {
@@ -1,121 +1,231 @@
-from oura_fetcher import OuraClient, OURA_CLIENT_ID, OURA_CLIENT_SECRET, upsert_oura_data
+"""
+Oura Historical Backfill
+Splits a date range into per-endpoint partitions on a fixed grid (every
+partition_days days from PARTITION_EPOCH, so reruns with a shifted range
+reuse the same partitions), queues them in the
+oura_backfill_checkpoints table and works through the queue concurrently,
+retrying failed partitions. Rerunning the same command only fetches the
+partitions that haven't finished. Partitions reaching into the last
+SETTLED_DAYS days are saved but left 'partial', since Oura still revises
+recent days, and are fetched again by the next run. Every write is an upsert (or, for heart
+rate, an insert that skips stored samples), so repeats are harmless.
+
+Usage:
+    python backfill_oura.py
+    python backfill_oura.py --start 2022-01-01 --end 2024-12-31 --endpoints heart_rate,activity
+    python backfill_oura.py --migrate-heart-rate --endpoints heart_rate
+"""
+
+from oura_fetcher import OuraClient, OURA_CLIENT_ID, OURA_CLIENT_SECRET, OURA_MAX_WORKERS, save_personal_info
 from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+import argparse
+import sys
+import time
 import oura_db
+import oura_sync
+
+# Heart rate requests must span < 30 days; 25 keeps a margin
+HR_CHUNK_DAYS = 25
+HR_ENDPOINT = "heart_rate"
+PERSONAL_INFO = "personal_info"
+
+DEFAULT_BACKFILL_DAYS = 90
+DEFAULT_PARTITION_DAYS = 30
+# Partition boundaries fall every partition_days days from this date
+PARTITION_EPOCH = date(2000, 1, 1)
+# Oura keeps revising the most recent days (late syncs, sleep scored in the morning)
+SETTLED_DAYS = 2
+
+# data_type: (label, API path) for every date-ranged collection endpoint
+RANGE_ENDPOINTS = {
+    data_type: (label, path)
+    for label, path, data_type in
+    oura_sync.DAILY_ENDPOINTS + oura_sync.DETAIL_ENDPOINTS + oura_sync.EXTRA_ENDPOINTS
+}
+ALL_ENDPOINTS = list(RANGE_ENDPOINTS) + [HR_ENDPOINT, PERSONAL_INFO]
+
+def iter_chunks(start: date, end: date, chunk_days: int) -> Iterator[Tuple[date, date]]:
+    """
+    Split [start, end] into inclusive ranges along the chunk_days grid from
+    PARTITION_EPOCH; only the first and last range are clipped to the bounds.
+    """
+    offset = (start - PARTITION_EPOCH).days % chunk_days
+    cell_start = start - timedelta(days=offset)
+    while cell_start <= end:
+        cell_end = cell_start + timedelta(days=chunk_days - 1)
+        yield max(cell_start, start), min(cell_end, end)
+        cell_start = cell_end + timedelta(days=1)
+
+def settled_through(today: date = None) -> date:
+    """Last day whose data Oura is done revising; later partitions are never marked done."""
+    return (today or date.today()) - timedelta(days=SETTLED_DAYS)
+
+def partition_job(client, endpoint: str, chunk_start: str, chunk_end: str) -> oura_sync.SyncJob:
+    """
+    Fetch one endpoint partition page by page, saving each page as it
+    arrives, then mark it done in the queue (or 'partial' if it reaches
+    past settled_through()). A failed request or a failed page write
+    raises, marking the partition failed instead.
+    """
+    def fetch():
+        try:
+            if endpoint == HR_ENDPOINT:
+                return oura_sync.stream_heart_rate(
+                    client, f"{chunk_start}T00:00:00", f"{chunk_end}T23:59:59"
+                )
+            path = RANGE_ENDPOINTS[endpoint][1]
+            return oura_sync.stream_documents(
+                client, path, {"start_date": chunk_start, "end_date": chunk_end}, endpoint
+            )
+        except Exception as e:
+            oura_db.mark_chunk(endpoint, chunk_start, chunk_end, "failed", error=str(e))
+            raise
 
-def main():
+    def write(result):
+        records = result['records']
+        if endpoint == HR_ENDPOINT:
+            summary = f"Saved {records} samples ({result['pages']} pages): {result['inserted']} new."
+        else:
+            summary = (f"Saved {records} records ({result['pages']} pages): {result['inserted']} new, "
+                       f"{result['updated']} updated, {result['unchanged']} unchanged.")
+        status = "done" if chunk_end <= settled_through().isoformat() else "partial"
+        if status == "partial":
+            summary += " Not settled yet; refetched next run."
+        oura_db.mark_chunk(endpoint, chunk_start, chunk_end, status, records=records)
+        return summary
+
+    return oura_sync.SyncJob(f"{endpoint} {chunk_start}..{chunk_end}", fetch, write)
+
+def queue_partitions(endpoints: List[str], start: date, end: date, partition_days: int) -> int:
+    """Queue every partition of every endpoint; returns how many were new."""
+    chunks = []
+    for endpoint in endpoints:
+        days = min(partition_days, HR_CHUNK_DAYS) if endpoint == HR_ENDPOINT else partition_days
+        chunks += [(endpoint, s.isoformat(), e.isoformat()) for s, e in iter_chunks(start, end, days)]
+    return oura_db.enqueue_chunks(chunks)
+
+def run_backfill(client, endpoints: List[str], start: date, end: date,
+                 partition_days: int = DEFAULT_PARTITION_DAYS,
+                 max_workers: int = OURA_MAX_WORKERS, retries: int = 2) -> bool:
+    """
+    Queue the partitions of the given endpoints and work through the queue.
+    Partitions that fail are retried up to `retries` more times in this run,
+    with a growing pause between rounds; any still failing stay queued for
+    the next run. Partial partitions (see settled_through) are fetched once
+    per run.
+
+    Returns:
+        True if every queued partition in the range was fetched
+    """
+    oura_db.create_backfill_checkpoints_table()
+    new = queue_partitions(endpoints, start, end, partition_days)
+    fetched = ('done', 'partial')
+
+    for attempt in range(retries + 1):
+        pending = oura_db.get_pending_chunks(endpoints, start.isoformat(), end.isoformat(),
+                                             skip_statuses=('done',) if attempt == 0 else fetched)
+        if not pending:
+            print("✅ Every partition is backfilled.")
+            return True
+
+        if attempt == 0:
+            print(f"{len(pending)} partition(s) to fetch ({new} newly queued).")
+        else:
+            pause = 2 ** attempt
+            print(f"\n🔁 Retry {attempt}/{retries}: {len(pending)} partition(s) in {pause}s...")
+            time.sleep(pause)
+
+        oura_sync.run_sync(
+            (partition_job(client, endpoint, s, e) for endpoint, s, e in pending),
+            max_workers=max_workers
+        )
+
+    remaining = oura_db.get_pending_chunks(endpoints, start.isoformat(), end.isoformat(),
+                                           skip_statuses=fetched)
+    if remaining:
+        print(f"⚠️ {len(remaining)} partition(s) still failing; rerun the same command to retry them.")
+        return False
+    print("✅ Every partition is backfilled.")
+    return True
+
+def parse_args(argv=None) -> argparse.Namespace:
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Backfill historical Oura data.")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        default=today - timedelta(days=DEFAULT_BACKFILL_DAYS),
+                        help=f"First day to backfill, YYYY-MM-DD (default: {DEFAULT_BACKFILL_DAYS} days ago)")
+    parser.add_argument("--end", type=date.fromisoformat, default=today,
+                        help="Last day to backfill, YYYY-MM-DD (default: today)")
+    parser.add_argument("--endpoints", default=",".join(ALL_ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ALL_ENDPOINTS)} (default: all)")
+    parser.add_argument("--partition-days", type=int, default=DEFAULT_PARTITION_DAYS,
+                        help=f"Days per request partition (default: {DEFAULT_PARTITION_DAYS}; "
+                             f"heart rate is capped at {HR_CHUNK_DAYS})")
+    parser.add_argument("--workers", type=int, default=OURA_MAX_WORKERS,
+                        help=f"Concurrent requests (default: {OURA_MAX_WORKERS})")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Extra attempts for failed partitions in this run (default: 2)")
+    parser.add_argument("--migrate-heart-rate", action="store_true",
+                        help="First copy heart rate stored as per-day blobs in oura_data into oura_heart_rate")
+    args = parser.parse_args(argv)
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in args.endpoints if name not in ALL_ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+    if args.start > args.end:
+        parser.error("--start must not be after --end")
+    if args.partition_days < 1 or args.workers < 1 or args.retries < 0:
+        parser.error("--partition-days and --workers must be >= 1, --retries >= 0")
+    return args
+
+def main(argv=None) -> bool:
+    """
+    Run the backfill.
+
+    Returns:
+        True if every partition in the range was fetched
+    """
+    args = parse_args(argv)
     print("--- Oura Historical Backfill ---")
-    
+
     if not OURA_CLIENT_ID or not OURA_CLIENT_SECRET:
         print("❌ Error: OURA_CLIENT_ID or OURA_CLIENT_SECRET not found.")
-        return
+        return False
+
+    print(f"Time Range: {args.start} to {args.end}")
+    print(f"Endpoints: {', '.join(args.endpoints)}")
 
-    # Default to last 90 days. User can change this source code if they want more.
-    # Or we can make it interactive? Let's hardcode a good default for now.
-    today = date.today()
-    start_backfill = today - timedelta(days=90) # 3 Months
-    
-    start_date = start_backfill.isoformat()
-    end_date = today.isoformat()
-    
-    print(f"Time Range: {start_date} to {end_date}")
-    
     client = OuraClient(OURA_CLIENT_ID, OURA_CLIENT_SECRET)
-    
+
     # Initialize DB (just in case)
     oura_db.create_oura_table()
+    oura_db.create_heart_rate_table()
 
-    def print_result(name, data, data_type_key=None):
-        if data and 'data' in data:
-            count = len(data['data'])
-            print(f"✅ {name}: Found {count} records.")
-            
-            key = data_type_key or name.lower().replace(" ", "_")
-            saved_count = 0
-            for item in data['data']:
-                date_val = item.get('day')
-                if not date_val and 'timestamp' in item:
-                    date_val = item['timestamp'].split('T')[0]
-                elif not date_val and 'start_datetime' in item:
-                    date_val = item['start_datetime'].split('T')[0]
-                
-                if date_val:
-                    if upsert_oura_data(key, date_val, item):
-                        saved_count += 1
-            # print(f"   Saved {saved_count} to DB.")
-        else:
-            print(f"⚠️ {name}: No data or error.")
+    if args.migrate_heart_rate:
+        copied = oura_db.migrate_heart_rate_blobs()
+        print(f"✅ Copied {copied} heart rate samples from oura_data into oura_heart_rate.")
 
     print(f"\nFetching data...")
-    
-    # Fetch Daily Metrics
-    print_result("Activity", client.get_daily_activity(start_date, end_date), "activity")
-    print_result("Sleep Daily", client.get_daily_sleep(start_date, end_date), "sleep_daily")
-    print_result("Readiness", client.get_daily_readiness(start_date, end_date), "readiness")
-    print_result("Daily Stress", client.get_daily_stress(start_date, end_date), "daily_stress")
-    print_result("Daily SpO2", client.get_daily_spo2(start_date, end_date), "daily_spo2")
-    print_result("Daily Resilience", client.get_daily_resilience(start_date, end_date), "daily_resilience")
-    print_result("Cardio Age", client.get_daily_cardiovascular_age(start_date, end_date), "cardio_age")
-    
-    # Heart Rate (Chunking required: < 30 days per request)
-    print("Heart Rate (fetching in chunks)...")
-    
-    current_start = start_backfill
-    final_end = today
-    
-    all_hr_data = []
-    
-    while current_start < final_end:
-        # Define chunk end (25 days to be safe)
-        chunk_end = current_start + timedelta(days=25)
-        if chunk_end > final_end:
-            chunk_end = final_end
-            
-        print(f"   Fetching HR from {current_start} to {chunk_end}...")
-        
-        hr_chunk = client.get_heart_rate(f"{current_start.isoformat()}T00:00:00", f"{chunk_end.isoformat()}T23:59:59")
-        
-        if hr_chunk and 'data' in hr_chunk:
-            all_hr_data.extend(hr_chunk['data'])
-            
-        # Move to next chunk
-        current_start = chunk_end + timedelta(days=1)
-
-    if all_hr_data:
-        print(f"✅ Heart Rate: Found {len(all_hr_data)} total records.")
-        # Group by day
-        hr_by_day = {}
-        for item in all_hr_data:
-            d = item['timestamp'].split('T')[0]
-            if d not in hr_by_day: hr_by_day[d] = []
-            hr_by_day[d].append(item)
-        
-        for d, items in hr_by_day.items():
-            upsert_oura_data("heart_rate", d, {"data": items})
-        print("   Saved Heart Rate groups to DB.")
-    else:
-        print("⚠️ Heart Rate: No data found in any chunk.")
-
-    # Details
-    print_result("Sleep Detailed", client.get_sleep_documents(start_date, end_date), "sleep_detailed")
-    print_result("Sleep Time", client.get_sleep_time(start_date, end_date), "sleep_time")
-    print_result("Workouts", client.get_workouts(start_date, end_date), "workout")
-    print_result("Sessions", client.get_sessions(start_date, end_date), "session")
-    print_result("Tags", client.get_tags(start_date, end_date), "tag")
-    print_result("Enhanced Tags", client.get_enhanced_tags(start_date, end_date), "enhanced_tag")
-    print_result("Rest Mode", client.get_rest_mode_periods(start_date, end_date), "rest_mode_period")
-    # print_result("Ring Config", client.get_ring_configuration(start_date, end_date), "ring_configuration")
-    print_result("VO2 Max", client.get_vo2_max(start_date, end_date), "vo2_max")
+    ranged = [name for name in args.endpoints if name != PERSONAL_INFO]
+    complete = run_backfill(client, ranged, args.start, args.end, args.partition_days,
+                            args.workers, args.retries)
 
     # Fetch Personal Info (Singleton) - Backfilling this basically just grabs the current state
-    p_info = client.get_personal_info()
-    if p_info:
-        # Use latest date for backfill
-        upsert_oura_data("personal_info", today.isoformat(), p_info)
-        print("✅ Personal Info: Fetched and saved.")
-    else:
-        print("⚠️ Personal Info: No data.")
+    if PERSONAL_INFO in args.endpoints:
+        try:
+            save_personal_info(client.get_personal_info(), date.today().isoformat())
+        except RuntimeError as e:
+            print(f"❌ Personal Info: {e}")
+            complete = False
 
-    print("\n🎉 Backfill Complete!")
+    print(client.format_fetch_stats())
+    if complete:
+        print("\n🎉 Backfill Complete!")
+    else:
+        print("\n⚠️ Backfill incomplete; rerun to resume.")
+    return complete
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the single-pass P&L engine.
+Builds a synthetic 100k-fill history and compares the old per-ticker approach
+(one aggregate_fills pass per ticker) with one compute_pnl_by_ticker pass.
+No credentials or network access are needed.
+"""
+
+import random
+import time
+from kalshi import aggregate_fills, compute_pnl_by_ticker
+
+NUM_FILLS = 100_000
+NUM_TICKERS = 500
+SEED = 42
+
+
+def make_fills(num_fills: int, num_tickers: int) -> list:
+    """Generate fills in chronological order spread across num_tickers markets."""
+    rng = random.Random(SEED)
+    tickers = [f"KXBENCH-{i:04d}-YES" for i in range(num_tickers)]
+    fills = []
+    for i in range(num_fills):
+        yes_price = rng.randint(1, 99)
+        fills.append({
+            'trade_id': f"t{i}",
+            'ticker': rng.choice(tickers),
+            'side': rng.choice(('yes', 'no')),
+            'action': rng.choice(('buy', 'buy', 'sell')),
+            'count': rng.randint(1, 50),
+            'yes_price': yes_price,
+            'no_price': 100 - yes_price,
+            'created_time': f"2025-01-01T00:00:{i:09d}Z"
+        })
+    return fills
+
+
+def per_ticker_passes(fills: list) -> dict:
+    """The old shape: one filtered pass over the history per ticker."""
+    tickers = sorted({fill['ticker'] for fill in fills})
+    return {
+        ticker: aggregate_fills(fill for fill in fills if fill['ticker'] == ticker)
+        for ticker in tickers
+    }
+
+
+def main():
+    fills = make_fills(NUM_FILLS, NUM_TICKERS)
+
+    start = time.perf_counter()
+    old = per_ticker_passes(fills)
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = compute_pnl_by_ticker(fills)
+    new_seconds = time.perf_counter() - start
+
+    # Order-independent totals must agree between the two approaches
+    for ticker, expected in old.items():
+        for key in ('total_cost', 'total_sales', 'net_position'):
+            assert new[ticker][key] == expected[key], (ticker, key)
+
+    print(f"{NUM_FILLS} fills across {NUM_TICKERS} tickers")
+    print(f"  Per-ticker passes: {old_seconds:.3f}s")
+    print(f"  Single pass:       {new_seconds:.3f}s")
+    print(f"  Speedup:           {old_seconds / new_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
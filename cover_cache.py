@@ -0,0 +1,182 @@
+"""
+Cover Art Cache - Database Persistence
+Remembers resolved cover images (and misses) per normalised track/artist so
+recurring chart entries don't trigger new Spotify/SerpApi searches
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from db_helpers import execute_query, get_db_connection, commit
+
+TABLE_NAME = "cover_art_cache"
+
+# How long a found image / a confirmed miss is trusted before searching again
+POSITIVE_TTL_DAYS = int(os.getenv("COVER_CACHE_TTL_DAYS", "90"))
+NEGATIVE_TTL_DAYS = int(os.getenv("COVER_CACHE_NEGATIVE_TTL_DAYS", "7"))
+
+_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0}
+_stats_lock = threading.Lock()
+_table_ready = False
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Case-fold, Unicode-normalise and collapse whitespace for cache keys."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def song_key(song: List[str]) -> Tuple[str, str]:
+    """Cache key for a [song_name, artist_name] pair."""
+    return normalize_key(song[0]), normalize_key(song[1])
+
+
+def ensure_table() -> bool:
+    """Create the cover_art_cache table if it doesn't exist (once per process)."""
+    global _table_ready
+    if _table_ready:
+        return True
+
+    query = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        track_key VARCHAR(255) NOT NULL,
+        artist_key VARCHAR(255) NOT NULL,
+        image_url TEXT,
+        source VARCHAR(20),
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (track_key, artist_key)
+    );
+    """
+    try:
+        execute_query(query)
+        _table_ready = True
+        return True
+    except Exception as e:
+        print(f"Error creating table '{TABLE_NAME}': {e}")
+        return False
+
+
+def _count(stat: str, amount: int = 1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def lookup_many(songs: List[List[str]]) -> Dict[Tuple[str, str], Optional[str]]:
+    """
+    Look up unexpired cache entries for several songs in one query.
+
+    Returns:
+        Dictionary of song_key: image_url for every cached song; a None value
+        is a cached miss (negative result)
+    """
+    if not songs or not ensure_table():
+        _count('misses', len(songs))
+        return {}
+
+    keys = list(dict.fromkeys(song_key(song) for song in songs))
+    query = f"""
+        SELECT track_key, artist_key, image_url FROM {TABLE_NAME}
+        WHERE (track_key, artist_key) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+        AND expires_at > CURRENT_TIMESTAMP;
+    """
+    try:
+        rows = execute_query(query, ([k[0] for k in keys], [k[1] for k in keys]), fetch=True)
+    except Exception as e:
+        print(f"Error reading cover cache: {e}")
+        rows = []
+
+    cached = {(track, artist): url for track, artist, url in rows or []}
+    for song in songs:
+        key = song_key(song)
+        if key not in cached:
+            _count('misses')
+        elif cached[key] is None:
+            _count('negative_hits')
+        else:
+            _count('hits')
+    return cached
+
+
+def lookup(song: List[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Look up one song.
+
+    Returns:
+        Tuple of (found, image_url); found with a None url is a cached miss
+    """
+    cached = lookup_many([song])
+    key = song_key(song)
+    return key in cached, cached.get(key)
+
+
+def store_many(entries: List[Tuple[List[str], Optional[str], Optional[str]]]) -> int:
+    """
+    Cache resolved covers; a None image_url is cached as a miss with the shorter TTL.
+
+    Args:
+        entries: List of (song, image_url, source) tuples
+
+    Returns:
+        Number of rows written
+    """
+    if not entries or not ensure_table():
+        return 0
+
+    rows = {}
+    for song, image_url, source in entries:
+        ttl_days = POSITIVE_TTL_DAYS if image_url else NEGATIVE_TTL_DAYS
+        track, artist = song_key(song)
+        rows[(track, artist)] = (track, artist, image_url, source, ttl_days)
+
+    # expires_at is computed server-side so it shares a clock with the lookup query
+    query = f"""
+        INSERT INTO {TABLE_NAME} (track_key, artist_key, image_url, source, expires_at)
+        VALUES %s
+        ON CONFLICT (track_key, artist_key) DO UPDATE SET
+            image_url = EXCLUDED.image_url,
+            source = EXCLUDED.source,
+            fetched_at = CURRENT_TIMESTAMP,
+            expires_at = EXCLUDED.expires_at;
+    """
+    try:
+        with get_db_connection() as (conn, cursor):
+            execute_values(
+                cursor, query, list(rows.values()),
+                template="(%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(days => %s))",
+                page_size=len(rows)
+            )
+            written = cursor.rowcount
+            commit(conn)
+    except Exception as e:
+        print(f"Error writing cover cache: {e}")
+        return 0
+
+    _count('stores', written)
+    return written
+
+
+def store(song: List[str], image_url: Optional[str], source: Optional[str]) -> int:
+    """Cache a single resolved cover (or miss)."""
+    return store_many([(song, image_url, source)])
+
+
+def get_stats() -> Dict[str, float]:
+    """Return hit/miss counters and the hit rate (negative hits count as hits)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['hits'] + stats['negative_hits']) / lookups if lookups else 0.0
+    return stats
+
+
+def format_stats() -> str:
+    """One-line summary of cover cache usage."""
+    stats = get_stats()
+    return (f"Cover cache: {stats['hits']} hits, {stats['negative_hits']} cached misses, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
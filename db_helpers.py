@@ -8,9 +8,15 @@ from dotenv import load_dotenv
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+import atexit
+import io
+import json
 import os
+import threading
+import time
 
 
 # Database connection parameters from environment variables
@@ -37,31 +43,345 @@ def get_db_params():
             'port': '5432'
         }
 
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by the whole process.
+
+    Connections are health-checked on checkout (a cheap ``SELECT 1`` once a
+    connection has been idle for ``health_check_after`` seconds), connections
+    idle for longer than ``idle_timeout`` are closed down to ``minconn``, and
+    callers wait up to ``wait_timeout`` seconds when all ``maxconn``
+    connections are checked out.
+    """
+
+    def __init__(self, minconn: int = 1, maxconn: int = 5, idle_timeout: float = 300.0,
+                 health_check_after: float = 30.0, wait_timeout: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.wait_timeout = wait_timeout
+
+        self._idle = []  # list of (connection, returned_at), most recently used last
+        self._in_use = 0
+        self._closed = False
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'connects': 0,
+            'connect_seconds': 0.0,
+            'reconnects': 0,
+            'health_checks': 0,
+            'evictions': 0,
+            'discards': 0,
+        }
+
+    def _connect(self):
+        """Open a new connection and record how long the handshake took."""
+        started = time.perf_counter()
+        connection = psycopg2.connect(**get_db_params())
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._stats['connects'] += 1
+            self._stats['connect_seconds'] += elapsed
+        return connection
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _evict_idle_locked(self, now: float):
+        """Close connections idle for longer than idle_timeout, keeping minconn warm."""
+        while len(self._idle) > self.minconn:
+            connection, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.pop(0)
+            self._close_quietly(connection)
+            self._stats['evictions'] += 1
+
+    def _is_healthy(self, connection) -> bool:
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """Check out a connection, waiting if the pool is exhausted."""
+        if os.getpid() != self._pid:
+            # Connections must not be shared across a fork; start afresh in the child.
+            self._reset_after_fork()
+
+        with self._cond:
+            if self._closed:
+                raise PoolError("connection pool is closed")
+
+            self._stats['checkouts'] += 1
+            self._evict_idle_locked(time.monotonic())
+
+            if not self._idle and self._in_use >= self.maxconn:
+                self._stats['waits'] += 1
+                started = time.monotonic()
+                deadline = started + self.wait_timeout
+                while not self._idle and self._in_use >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        self._stats['wait_seconds'] += time.monotonic() - started
+                        raise PoolError(
+                            f"no database connection available after {self.wait_timeout}s "
+                            f"({self.maxconn} in use)"
+                        )
+                    self._cond.wait(remaining)
+                self._stats['wait_seconds'] += time.monotonic() - started
+
+            entry = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if entry is None:
+                return self._connect()
+
+            connection, returned_at = entry
+            if connection.closed or time.monotonic() - returned_at >= self.health_check_after:
+                with self._cond:
+                    self._stats['health_checks'] += 1
+                if not self._is_healthy(connection):
+                    self._close_quietly(connection)
+                    with self._cond:
+                        self._stats['reconnects'] += 1
+                    return self._connect()
+            return connection
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, connection, discard: bool = False):
+        """Return a connection to the pool, resetting any open transaction."""
+        if not discard and not connection.closed:
+            try:
+                if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use = max(self._in_use - 1, 0)
+            if discard or connection.closed or self._closed or os.getpid() != self._pid:
+                self._stats['discards'] += 1
+                self._close_quietly(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            for connection, _ in self._idle:
+                self._close_quietly(connection)
+            self._idle = []
+            self._cond.notify_all()
+
+    def _reset_after_fork(self):
+        with self._cond:
+            self._idle = []
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool counters, including estimated handshake time saved."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+        avg_connect = stats['connect_seconds'] / stats['connects'] if stats['connects'] else 0.0
+        stats['avg_connect_seconds'] = avg_connect
+        stats['saved_connects'] = max(stats['checkouts'] - stats['connects'], 0)
+        stats['est_saved_seconds'] = stats['saved_connects'] * avg_connect
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    Sizing is configurable through DB_POOL_MIN, DB_POOL_MAX,
+    DB_POOL_IDLE_TIMEOUT, DB_POOL_HEALTH_CHECK_AFTER and DB_POOL_WAIT_TIMEOUT.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                    maxconn=int(os.getenv('DB_POOL_MAX', '5')),
+                    idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+                    health_check_after=float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '30')),
+                    wait_timeout=float(os.getenv('DB_POOL_WAIT_TIMEOUT', '30')),
+                )
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide pool. A later get_pool() call builds a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Return counters (checkouts, waits, reconnects, ...) for the process-wide pool."""
+    return get_pool().stats()
+
+
+def print_pool_stats():
+    """Print a one-line summary of connection pool usage."""
+    stats = get_pool_stats()
+    print(f"DB pool: {stats['checkouts']} checkouts, {stats['connects']} connects, "
+          f"{stats['reconnects']} reconnects, {stats['waits']} waits "
+          f"({stats['wait_seconds']:.2f}s), ~{stats['est_saved_seconds']:.2f}s handshake time saved")
+
+
+class _Transaction:
+    """State for an open transaction() on the current thread."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.failed = False
+
+
+_tx_state = threading.local()
+
+
+def _current_transaction() -> Optional[_Transaction]:
+    return getattr(_tx_state, 'tx', None)
+
+
+def in_transaction() -> bool:
+    """Return True if the current thread is inside a transaction() block."""
+    return _current_transaction() is not None
+
+
+def commit(connection):
+    """Commit the connection unless it belongs to an enclosing transaction()."""
+    if _current_transaction() is None:
+        connection.commit()
+
+
+@contextmanager
+def transaction():
+    """
+    Run several db_helpers calls as one unit of work on a single connection.
+
+    Every helper called inside the block (execute_query, truncate_table,
+    insert_many, count_records, ...) reuses the same connection and skips its
+    own commit; the block commits once on exit. If any statement fails, or the
+    block raises, everything is rolled back and an exception is raised, so
+    readers never observe a half-applied refresh (e.g. a truncated table
+    waiting for its bulk insert). Nested transaction() blocks join the
+    outermost one.
+
+    Yields:
+        The underlying psycopg2 connection
+    """
+    outer = _current_transaction()
+    if outer is not None:
+        yield outer.connection
+        return
+
+    pool = get_pool()
+    connection = pool.getconn()
+    tx = _Transaction(connection)
+    _tx_state.tx = tx
+    discard = False
+    try:
+        yield connection
+        if tx.failed:
+            raise psycopg2.DatabaseError("a statement inside the transaction failed; rolled back")
+        connection.commit()
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception:
+            discard = True
+        raise
+    finally:
+        _tx_state.tx = None
+        pool.putconn(connection, discard=discard)
+
+
 @contextmanager
 def get_db_connection(use_dict_cursor: bool = False):
     """
     Context manager for database connections.
-    Automatically handles connection opening and closing.
+    Checks a connection out of the process-wide pool and returns it afterwards.
+    Inside a transaction() block, the transaction's connection is used instead.
     
     Args:
         use_dict_cursor: If True, returns rows as dictionaries instead of tuples
     """
+    tx = _current_transaction()
+    if tx is not None:
+        cursor = tx.connection.cursor(cursor_factory=RealDictCursor) if use_dict_cursor else tx.connection.cursor()
+        try:
+            yield tx.connection, cursor
+        except Exception:
+            tx.failed = True
+            raise
+        finally:
+            cursor.close()
+        return
+
+    pool = get_pool()
     connection = None
     cursor = None
+    discard = False
     try:
-        connection = psycopg2.connect(**get_db_params())
+        connection = pool.getconn()
         cursor = connection.cursor(cursor_factory=RealDictCursor) if use_dict_cursor else connection.cursor()
         yield connection, cursor
     except Exception as error:
         if connection:
-            connection.rollback()
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            discard = True
         raise error
 
     finally:
         if cursor:
-            cursor.close()
+            try:
+                cursor.close()
+            except Exception:
+                pass
         if connection:
-            connection.close()
+            pool.putconn(connection, discard=discard)
 
 
 def execute_query(query: str, params: tuple = None, fetch: bool = False, 
@@ -87,10 +407,30 @@ def execute_query(query: str, params: tuple = None, fetch: bool = False,
         elif fetch_one:
             return cursor.fetchone()
         else:
-            conn.commit()
+            commit(conn)
             return None
 
 
+def execute_many(query: str, params_list: List[tuple]) -> int:
+    """
+    Execute a query once per parameter tuple on a single connection.
+    
+    Args:
+        query: SQL query to execute
+        params_list: List of parameter tuples
+        
+    Returns:
+        Number of parameter tuples executed
+    """
+    if not params_list:
+        return 0
+
+    with get_db_connection() as (conn, cursor):
+        cursor.executemany(query, params_list)
+        commit(conn)
+        return len(params_list)
+
+
 def create_table(table_name: str, columns: Dict[str, str]) -> bool:
     """
     Create a table with specified columns.
@@ -146,6 +486,7 @@ def insert_record(table_name: str, data: Dict[str, Any]) -> Optional[int]:
 def insert_many(table_name: str, data_list: List[Dict[str, Any]]) -> bool:
     """
     Insert multiple records into a table.
+    Rows are streamed in a single COPY via bulk_load().
     
     Args:
         table_name: Name of the table
@@ -158,26 +499,118 @@ def insert_many(table_name: str, data_list: List[Dict[str, Any]]) -> bool:
         return False
         
     try:
-        with get_db_connection() as (conn, cursor):
-            columns = list(data_list[0].keys())
-            
-            query = sql.SQL("INSERT INTO {} ({}) VALUES ({});").format(
-                sql.Identifier(table_name),
-                sql.SQL(', ').join(map(sql.Identifier, columns)),
-                sql.SQL(', ').join(sql.Placeholder() * len(columns))
-            )
-            
-            values_list = [tuple(record[col] for col in columns) for record in data_list]
-            cursor.executemany(query.as_string(conn), values_list)
-            conn.commit()
-            
-            print(f"{len(data_list)} records inserted successfully into '{table_name}'.")
-            return True
+        columns = list(data_list[0].keys())
+        values_list = [tuple(record[col] for col in columns) for record in data_list]
+        bulk_load(table_name, columns, values_list)
+        
+        print(f"{len(data_list)} records inserted successfully into '{table_name}'.")
+        return True
     except Exception as error:
         print(f"Error inserting multiple records into '{table_name}':", error)
         return False
 
 
+def _copy_field(value: Any) -> str:
+    """Render one value as a CSV field for COPY. NULL is the only unquoted empty field."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        text = 'true' if value else 'false'
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    else:
+        text = str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _copy_buffer(rows: Sequence[Sequence[Any]]) -> io.StringIO:
+    """Serialize rows into an in-memory CSV buffer suitable for COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_copy_field(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def bulk_load(table_name: str, columns: List[str], rows: Sequence[Sequence[Any]],
+              conflict_columns: List[str] = None, update_columns: List[str] = None,
+              extra_updates: Dict[str, str] = None) -> int:
+    """
+    Bulk-load rows with COPY ... FROM STDIN instead of one INSERT per row.
+    
+    Without conflict_columns the rows are copied straight into the table.
+    With conflict_columns they are copied into a temporary staging table and
+    merged with a single INSERT ... SELECT ... ON CONFLICT; rows sharing a
+    conflict key are de-duplicated first (last one wins).
+    
+    Args:
+        table_name: Name of the target table, as stored (identifiers are quoted,
+            so a table created unquoted must be passed in lowercase)
+        columns: Column names, in the same order as each row (as stored, too)
+        rows: Sequence of row tuples/lists (dicts and lists are written as JSON)
+        conflict_columns: Columns of the unique constraint to merge on
+        update_columns: Columns to overwrite on conflict (DO NOTHING if empty)
+        extra_updates: Extra column: SQL expression pairs applied on conflict
+        
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+
+    table = sql.Identifier(table_name)
+    column_sql = sql.SQL(', ').join(map(sql.Identifier, columns))
+
+    if not conflict_columns:
+        with get_db_connection() as (conn, cursor):
+            cursor.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(table, column_sql),
+                _copy_buffer(rows)
+            )
+            commit(conn)
+            return cursor.rowcount if cursor.rowcount >= 0 else len(rows)
+
+    key_indexes = [columns.index(col) for col in conflict_columns]
+    deduped = {}
+    for row in rows:
+        deduped[tuple(row[i] for i in key_indexes)] = row
+    rows = list(deduped.values())
+
+    # extra_updates values are SQL expressions supplied by the caller, not data
+    assignments = [sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(col), sql.Identifier(col))
+                   for col in (update_columns or [])]
+    assignments += [sql.SQL("{} = ").format(sql.Identifier(col)) + sql.SQL(expression)
+                    for col, expression in (extra_updates or {}).items()]
+    if assignments:
+        conflict_action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(', ').join(assignments))
+    else:
+        conflict_action = sql.SQL("DO NOTHING")
+
+    staging = sql.Identifier(f"_bulk_stage_{table_name.lower()}")
+    with get_db_connection() as (conn, cursor):
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(staging))
+        cursor.execute(
+            sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA;").format(
+                staging, column_sql, table
+            )
+        )
+        cursor.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(staging, column_sql),
+            _copy_buffer(rows)
+        )
+        cursor.execute(
+            sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {};").format(
+                table, column_sql, column_sql, staging,
+                sql.SQL(', ').join(map(sql.Identifier, conflict_columns)), conflict_action
+            )
+        )
+        written = cursor.rowcount
+        cursor.execute(sql.SQL("DROP TABLE {};").format(staging))
+        commit(conn)
+        return written
+
+
 def update_record(table_name: str, data: Dict[str, Any], 
                  condition: str, condition_params: tuple = None) -> int:
     """
@@ -199,7 +632,7 @@ def update_record(table_name: str, data: Dict[str, Any],
             
             params = tuple(data.values()) + (condition_params if condition_params else ())
             cursor.execute(query, params)
-            conn.commit()
+            commit(conn)
             
             rows_updated = cursor.rowcount
             print(f"{rows_updated} record(s) updated in '{table_name}'.")
@@ -225,7 +658,7 @@ def delete_record(table_name: str, condition: str, condition_params: tuple = Non
         with get_db_connection() as (conn, cursor):
             query = f"DELETE FROM {table_name} WHERE {condition};"
             cursor.execute(query, condition_params)
-            conn.commit()
+            commit(conn)
             
             rows_deleted = cursor.rowcount
             print(f"{rows_deleted} record(s) deleted from '{table_name}'.")
@@ -272,6 +705,8 @@ def query_table(table_name: str, columns: str = "*", condition: str = None,
 def truncate_table(table_name: str, restart_identity: bool = True) -> bool:
     """
     Remove all records from a table.
+    Inside a transaction() the removal only becomes visible at commit, so a
+    truncate followed by a reload never exposes an empty table to readers.
     
     Args:
         table_name: Name of the table
@@ -2,42 +2,89 @@ from api_helpers import (
     get_github_repos, 
     get_lastfm_top_tracks, 
     get_spotify_bearer, 
-    get_cover_image
+    resolve_covers
 )
-from portfolio_operations import update_songs, update_repos
+from portfolio_operations import (
+    update_songs,
+    update_repos,
+    create_fingerprints_table,
+    fingerprint_payload,
+    get_dataset_fingerprint
+)
+from db_helpers import print_pool_stats
+from http_client import print_latency_report
+import os
 
-def main():
-    print("--- Starting Portfolio Update ---")
+# Set FORCE_REFRESH=1 to rewrite datasets even when their fingerprint is unchanged
+FORCE_REFRESH = os.getenv("FORCE_REFRESH", "").lower() in ("1", "true", "yes")
 
-    # 1. Update GitHub Repos
+def is_unchanged(dataset: str, fingerprint: str) -> bool:
+    """Compare a payload fingerprint with the stored one and log the decision."""
+    previous = get_dataset_fingerprint(dataset)
+    if previous == fingerprint and not FORCE_REFRESH:
+        print(f"[{dataset}] Unchanged (fingerprint {fingerprint[:12]}) - skipping refresh.")
+        return True
+    reason = "forced" if previous == fingerprint else f"{(previous or 'none')[:12]} -> {fingerprint[:12]}"
+    print(f"[{dataset}] Refreshing ({reason}).")
+    return False
+
+def refresh_repos() -> bool:
+    """Fetch GitHub repos and rewrite the repos table if they changed."""
     print("\nUpdating GitHub Repos...")
     repos = get_github_repos()
-    if repos:
-        update_repos(repos)
-    else:
+    if not repos:
         print("No repos found or error occurred.")
+        return False
+    
+    repos_fingerprint = fingerprint_payload(repos)
+    if is_unchanged("repos", repos_fingerprint):
+        return True
+    return update_repos(repos, fingerprint=repos_fingerprint)
 
-    # 2. Update Top Songs
+def refresh_songs() -> bool:
+    """Fetch the Last.fm weekly chart, resolve cover art and rewrite Songs if the chart changed."""
     print("\nUpdating Top Songs...")
     songs = get_lastfm_top_tracks(10)
+    if not songs:
+        print("No songs found or error occurred.")
+        return False
+    
+    # Fingerprint the chart itself, so an unchanged week skips the cover-art lookups too
+    songs_fingerprint = fingerprint_payload(songs)
+    if is_unchanged("songs", songs_fingerprint):
+        return True
+    
+    print("Fetching cover art...")
+    bearer = get_spotify_bearer()
     
-    if songs:
-        print("Fetching cover art...")
-        bearer = get_spotify_bearer()
+    # Resolve all covers concurrently; results come back in chart order
+    covers = resolve_covers(songs, bearer)
+    
+    # song is [name, artist]; append cover: [name, artist, cover_url]
+    songs_with_covers = [song + [cover_url] for song, cover_url in zip(songs, covers)]
+    print(f"Processed {len(songs_with_covers)} songs.")
+    
+    # A missing cover may be a transient lookup failure; leave the fingerprint
+    # unsaved so the next run retries instead of skipping an unchanged chart
+    missing = sum(1 for cover_url in covers if not cover_url)
+    if missing:
+        print(f"[songs] {missing} cover(s) missing - fingerprint not saved, will retry next run.")
+        songs_fingerprint = None
         
-        songs_with_covers = []
-        for song in songs:
-            # song is [name, artist]
-            cover_url = get_cover_image(song, bearer)
-            # Append cover to the list: [name, artist, cover_url]
-            song_entry = song + [cover_url]
-            songs_with_covers.append(song_entry)
-            print(f"Processed: {song[0]}")
-            
-        update_songs(songs_with_covers)
-    else:
-        print("No songs found or error occurred.")
+    return update_songs(songs_with_covers, fingerprint=songs_fingerprint)
+
+def main():
+    print("--- Starting Portfolio Update ---")
+    create_fingerprints_table()
+
+    # 1. Update GitHub Repos
+    refresh_repos()
+
+    # 2. Update Top Songs
+    refresh_songs()
         
+    print_pool_stats()
+    print_latency_report()
     print("\n--- Update Complete ---")
 
 if __name__ == "__main__":
@@ -2,14 +2,14 @@ from wakatime_client import WakaTimeClient
 from portfolio_operations import get_wakatime_db_data, update_wakatime_data
 import os
 import oura_fetcher
+from db_helpers import print_pool_stats
+from http_client import print_latency_report
 from dotenv import load_dotenv
 
 # load_dotenv()
 
-def main():
-    print("--- Starting Hourly Update ---")
-    
-    # --- WakaTime ---
+def update_wakatime() -> bool:
+    """Fetch WakaTime totals and store them if they moved since the last run."""
     print("\n[WakaTime] Fetching data...")
     
     client_id = os.getenv("WAKA_CLIENT_ID")
@@ -17,43 +17,56 @@ def main():
     
     if not client_id or not client_secret:
         print("❌ Error: WAKA_CLIENT_ID and WAKA_CLIENT_SECRET not found in .env")
-    else:
-        client = WakaTimeClient(client_id, client_secret)
-        data = client.get_stats()
+        return False
+    
+    client = WakaTimeClient(client_id, client_secret)
+    data = client.get_stats()
+    
+    if not data or 'data' not in data:
+        print("Failed to fetch WakaTime data.")
+        return False
+    
+    current_total_seconds = data['data']['total_seconds']
+    daily_average = data['data']['daily_average']
+    
+    # Fetch existing data from DB
+    db_result = get_wakatime_db_data()
+    
+    # Check if we need to update
+    if db_result:
+        # db_result is a list of RealDictRow or tuples depending on cursor
+        # portfolio_operations uses tuples for this specific query
+        db_total_seconds = db_result[0][0]
         
-        if not data or 'data' not in data:
-            print("Failed to fetch WakaTime data.")
-        else:
-            current_total_seconds = data['data']['total_seconds']
-            daily_average = data['data']['daily_average']
-            
-            # Fetch existing data from DB
-            db_result = get_wakatime_db_data()
+        print(f"Current API Seconds: {current_total_seconds}")
+        print(f"DB Seconds: {db_total_seconds}")
+        
+        if current_total_seconds <= db_total_seconds + 1:
+            print("Data already in database (no significant change).")
+            return True
             
-            # Check if we need to update
-            should_update = True
-            if db_result:
-                # db_result is a list of RealDictRow or tuples depending on cursor
-                # portfolio_operations uses tuples for this specific query
-                db_total_seconds = db_result[0][0]
-                
-                print(f"Current API Seconds: {current_total_seconds}")
-                print(f"DB Seconds: {db_total_seconds}")
-                
-                if current_total_seconds <= db_total_seconds + 1:
-                    print("Data already in database (no significant change).")
-                    should_update = False
-                    
-            if should_update:
-                print("New Data detected! Updating database...")
-                update_wakatime_data(current_total_seconds, daily_average)
+    print("New Data detected! Updating database...")
+    return update_wakatime_data(current_total_seconds, daily_average)
 
-    # --- Oura ---
+def update_oura() -> bool:
+    """Run the Oura fetcher; False if it couldn't start or any endpoint failed."""
     print("\n[Oura] Fetching data...")
+    return oura_fetcher.main()
+
+def main():
+    print("--- Starting Hourly Update ---")
+    
+    # --- WakaTime ---
+    update_wakatime()
+
+    # --- Oura ---
     try:
-        oura_fetcher.main()
+        update_oura()
     except Exception as e:
         print(f"❌ Error running Oura fetcher: {e}")
 
+    print_pool_stats()
+    print_latency_report()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+HTTP Validator Cache - Database Persistence
+Stores ETag / Last-Modified validators and the last response body per URL so
+API fetchers can send conditional requests and reuse the body on a 304
+"""
+
+from db_helpers import execute_query, bulk_load, get_db_connection, commit
+from typing import Any, Dict, List
+
+TABLE_NAME = "http_cache"
+
+
+def create_http_cache_table() -> bool:
+    """
+    Create the http_cache table.
+
+    Table Schema:
+    - url: Request URL (primary key)
+    - etag: ETag response header
+    - last_modified: Last-Modified response header
+    - next_url: rel="next" link of a paginated response
+    - body: Last 200 response body
+    - fetched_at: When the body was last downloaded or revalidated
+    """
+    query = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        next_url TEXT,
+        body JSONB NOT NULL,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    try:
+        execute_query(query)
+        return True
+    except Exception as e:
+        print(f"Error creating table '{TABLE_NAME}': {e}")
+        return False
+
+
+# Upper bound on the pages followed from one first page, in case of a next_url cycle
+MAX_CHAIN_PAGES = 100
+
+
+def load_http_cache(first_url: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load a cached paginated response: the row for first_url and every page
+    reached by following the stored next_url links from it. Later pages
+    can live at unrelated URLs (GitHub's next links use /user/<id>/repos),
+    so the chain is followed rather than matched by prefix.
+
+    Returns:
+        Dictionary of url: {etag, last_modified, next_url, body}
+    """
+    query = f"""
+        WITH RECURSIVE chain AS (
+            SELECT url, etag, last_modified, next_url, body, 1 AS depth
+            FROM {TABLE_NAME} WHERE url = %s
+            UNION ALL
+            SELECT c.url, c.etag, c.last_modified, c.next_url, c.body, chain.depth + 1
+            FROM {TABLE_NAME} c JOIN chain ON c.url = chain.next_url
+            WHERE chain.depth < %s
+        )
+        SELECT url, etag, last_modified, next_url, body FROM chain;
+    """
+    try:
+        rows = execute_query(query, (first_url, MAX_CHAIN_PAGES), fetch=True, use_dict=True)
+        return {row['url']: dict(row) for row in rows or []}
+    except Exception as e:
+        print(f"Error loading HTTP cache: {e}")
+        return {}
+
+
+def save_http_cache(entries: List[Dict[str, Any]]) -> int:
+    """
+    Insert or refresh cached responses.
+
+    Args:
+        entries: List of {url, etag, last_modified, next_url, body} dictionaries
+
+    Returns:
+        Number of rows written
+    """
+    columns = ["url", "etag", "last_modified", "next_url", "body"]
+    rows = [tuple(entry.get(col) for col in columns) for entry in entries]
+    if not rows:
+        return 0
+
+    try:
+        return bulk_load(
+            TABLE_NAME,
+            columns,
+            rows,
+            conflict_columns=["url"],
+            update_columns=["etag", "last_modified", "next_url", "body"],
+            extra_updates={"fetched_at": "CURRENT_TIMESTAMP"}
+        )
+    except Exception as e:
+        print(f"Error saving HTTP cache: {e}")
+        return 0
+
+
+def delete_http_cache(urls: List[str]) -> int:
+    """
+    Delete cached responses, e.g. pages that dropped out of a paginated result.
+
+    Returns:
+        Number of rows deleted
+    """
+    if not urls:
+        return 0
+    try:
+        with get_db_connection() as (conn, cursor):
+            cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE url = ANY(%s);", (list(urls),))
+            deleted = cursor.rowcount
+            commit(conn)
+            return deleted
+    except Exception as e:
+        print(f"Error deleting HTTP cache entries: {e}")
+        return 0
@@ -0,0 +1,232 @@
+"""
+Shared HTTP Client
+Pooled keep-alive sessions per host, default timeouts, retries with
+exponential backoff and jitter on 429/5xx (honouring Retry-After), and
+per-endpoint latency histograms
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from typing import ContextManager, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout applied when the caller doesn't pass one, in seconds
+DEFAULT_TIMEOUT = (3.05, 15)
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5   # First retry waits up to this long; doubles each attempt
+BACKOFF_MAX = 30.0   # Cap on any single backoff wait (Retry-After is honoured in full)
+# Retries stop once this much time has been spent on one call
+DEFAULT_DEADLINE = float(os.getenv("HTTP_DEADLINE_SECONDS", "60"))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(host: str) -> requests.Session:
+    """Return the keep-alive session for a host, creating its connection pool on first use."""
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+class LatencyHistogram:
+    """Request count, bucketed latencies, errors and retries for one endpoint."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.errors = 0
+        self.retries = 0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of requests."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def _record(endpoint: str, seconds: Optional[float] = None, error: bool = False, retry: bool = False):
+    with _histograms_lock:
+        histogram = _histograms.setdefault(endpoint, LatencyHistogram())
+        if seconds is not None:
+            histogram.observe(seconds)
+        if error:
+            histogram.errors += 1
+        if retry:
+            histogram.retries += 1
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def request(method: str, url: str, endpoint: Optional[str] = None,
+            retries: int = MAX_RETRIES, deadline: float = DEFAULT_DEADLINE,
+            session: Optional[requests.Session] = None,
+            limit: Optional[ContextManager] = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the host's pooled session, retrying transient failures.
+
+    Connection errors, timeouts and 429/5xx responses are retried with
+    exponential backoff and jitter (or the server's full Retry-After), until
+    retries or the deadline run out; a Retry-After that would overrun the
+    deadline returns the response straight away. Auth hooks run again on
+    every attempt, so signed requests are re-signed.
+
+    Args:
+        method: HTTP method
+        url: Absolute URL
+        endpoint: Label for latency stats (default: host + path); use a fixed
+            label when the path contains identifiers
+        retries: Maximum retries after the first attempt
+        deadline: Seconds after which no further retry is started
+        session: Use this session instead of the shared per-host one
+        limit: Held around each attempt (e.g. a provider semaphore) and
+            released while waiting to retry
+        **kwargs: Passed to requests (params, headers, json, data, auth, timeout...)
+
+    Returns:
+        The final response (callers check the status as before)
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt failed to connect
+    """
+    parsed = urlparse(url)
+    endpoint = endpoint or f"{method.upper()} {parsed.netloc}{parsed.path}"
+    session = session or get_session(parsed.netloc)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    limit = limit or nullcontext()
+    started = time.monotonic()
+
+    attempt = 0
+    while True:
+        attempt_started = time.perf_counter()
+        try:
+            with limit:
+                response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record(endpoint, time.perf_counter() - attempt_started, error=True)
+            delay = _backoff(attempt)
+            if attempt >= retries or time.monotonic() - started + delay > deadline:
+                raise
+        else:
+            _record(endpoint, time.perf_counter() - attempt_started,
+                    error=response.status_code >= 400)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            delay = _retry_after(response)
+            delay = _backoff(attempt) if delay is None else delay
+            if attempt >= retries or time.monotonic() - started + delay > deadline:
+                return response
+            response.close()
+
+        _record(endpoint, retry=True)
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through request()."""
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """POST through request()."""
+    return request("POST", url, **kwargs)
+
+
+def get_latency_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Return per-endpoint latency statistics.
+
+    Returns:
+        Dictionary of endpoint: {count, avg_seconds, p50_seconds, p95_seconds,
+        max_seconds, errors, retries, buckets}
+    """
+    with _histograms_lock:
+        stats = {}
+        for endpoint, histogram in _histograms.items():
+            stats[endpoint] = {
+                'count': histogram.count,
+                'avg_seconds': histogram.total_seconds / histogram.count if histogram.count else 0.0,
+                'p50_seconds': histogram.percentile(0.5),
+                'p95_seconds': histogram.percentile(0.95),
+                'max_seconds': histogram.max_seconds,
+                'errors': histogram.errors,
+                'retries': histogram.retries,
+                'buckets': list(zip(LATENCY_BUCKETS, histogram.buckets))
+            }
+        return stats
+
+
+def print_latency_report():
+    """Print one line per endpoint, slowest total time first."""
+    stats = get_latency_stats()
+    if not stats:
+        return
+
+    rows: List[Tuple[str, Dict]] = sorted(
+        stats.items(), key=lambda item: item[1]['avg_seconds'] * item[1]['count'], reverse=True
+    )
+    print("\nHTTP latency:")
+    for endpoint, s in rows:
+        print(f"  {endpoint}: {s['count']} requests, avg {s['avg_seconds']:.3f}s, "
+              f"p50 <= {s['p50_seconds']:.3f}s, p95 <= {s['p95_seconds']:.3f}s, "
+              f"max {s['max_seconds']:.3f}s, {s['errors']} errors, {s['retries']} retries")
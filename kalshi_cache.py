@@ -0,0 +1,89 @@
+"""
+Kalshi Metadata Cache - Database Persistence
+Stores rarely-changing series metadata next to kalshi_positions so hourly
+runs can skip the series lookups entirely
+"""
+
+from db_helpers import execute_query, bulk_load
+from typing import Dict, List
+
+TABLE_NAME = "kalshi_series_cache"
+
+
+def create_kalshi_series_cache_table() -> bool:
+    """
+    Create the kalshi_series_cache table.
+
+    Table Schema:
+    - series_ticker: Series ticker symbol (primary key)
+    - data: Raw series response from the Kalshi API
+    - fetched_at: When the series was fetched
+    """
+    query = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        series_ticker VARCHAR(255) PRIMARY KEY,
+        data JSONB NOT NULL,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    try:
+        execute_query(query)
+        return True
+    except Exception as e:
+        print(f"Error creating table '{TABLE_NAME}': {e}")
+        return False
+
+
+def load_series_cache(series_tickers: List[str], max_age_seconds: float) -> Dict[str, Dict]:
+    """
+    Load cached series responses that are younger than max_age_seconds.
+
+    Args:
+        series_tickers: Series tickers to look up
+        max_age_seconds: Maximum age of a usable entry
+
+    Returns:
+        Dictionary of series_ticker: series response
+    """
+    if not series_tickers:
+        return {}
+
+    query = f"""
+        SELECT series_ticker, data FROM {TABLE_NAME}
+        WHERE series_ticker = ANY(%s)
+        AND fetched_at > CURRENT_TIMESTAMP - make_interval(secs => %s);
+    """
+    try:
+        rows = execute_query(query, (list(series_tickers), max_age_seconds), fetch=True, use_dict=True)
+        return {row['series_ticker']: row['data'] for row in rows or []}
+    except Exception as e:
+        print(f"Error loading series cache: {e}")
+        return {}
+
+
+def save_series_cache(entries: Dict[str, Dict]) -> int:
+    """
+    Insert or refresh cached series responses.
+
+    Args:
+        entries: Dictionary of series_ticker: series response
+
+    Returns:
+        Number of rows written
+    """
+    rows = [(ticker, data) for ticker, data in entries.items() if data]
+    if not rows:
+        return 0
+
+    try:
+        return bulk_load(
+            TABLE_NAME,
+            ["series_ticker", "data"],
+            rows,
+            conflict_columns=["series_ticker"],
+            update_columns=["data"],
+            extra_updates={"fetched_at": "CURRENT_TIMESTAMP"}
+        )
+    except Exception as e:
+        print(f"Error saving series cache: {e}")
+        return 0
@@ -2,7 +2,7 @@
 Kalshi Position Updater - Scheduled Script
 Automatically updates Kalshi positions from API
 Similar to hourly.py for WakaTime tracking
-Uses insert_positions_bulk() to efficiently update all positions
+Uses sync_positions() to write only the positions that changed
 """
 
 from dotenv import load_dotenv
@@ -13,40 +13,56 @@ from kalshi_tracker import (
     create_kalshi_positions_table,
     create_kalshi_profile_table,
     table_exists,
-    refresh_positions,
     print_positions_summary,
     get_total_pnl,
     count_records,
-    insert_positions_bulk,
-    truncate_table,
+    sync_positions,
     fetch_profile_metrics,
-    upsert_profile_metrics
+    upsert_profile_metrics,
+    create_kalshi_fills_table,
+    sync_fills,
+    get_ledger_volume
 )
 from kalshi import get_user_holdings, process_holdings_with_series_info
+from kalshi_cache import create_kalshi_series_cache_table
+from db_helpers import print_pool_stats, transaction
+from http_client import print_latency_report
 
 
-def main():
-    """
-    Main function to update Kalshi positions.
-    Can be run on a schedule (e.g., hourly via cron or Heroku Scheduler).
-    """
-    print("\n" + "="*80)
-    print("KALSHI POSITION UPDATE - Starting...")
-    print("="*80 + "\n")
-    
-    # Ensure tables exist
+def ensure_tables() -> bool:
+    """Create the Kalshi tables that don't exist yet."""
     if not table_exists("kalshi_positions"):
         print("Table doesn't exist. Creating kalshi_positions table...")
         if not create_kalshi_positions_table():
             print("ERROR: Failed to create table. Exiting.")
-            return
+            return False
     
     if not table_exists("kalshi_profile"):
         print("Profile table doesn't exist. Creating kalshi_profile table...")
         if not create_kalshi_profile_table():
             print("ERROR: Failed to create profile table. Exiting.")
-            return
+            return False
+    
+    if not table_exists("kalshi_fills"):
+        print("Fills ledger doesn't exist. Creating kalshi_fills table...")
+        if not create_kalshi_fills_table():
+            print("ERROR: Failed to create fills table. Exiting.")
+            return False
+    
+    if not create_kalshi_series_cache_table():
+        print("ERROR: Failed to create series cache table. Exiting.")
+        return False
+    
+    return True
+
+
+def update_positions() -> bool:
+    """
+    Fetch holdings, enrich them with series info and sync kalshi_positions.
     
+    Returns:
+        False if holdings could not be fetched or the sync failed
+    """
     # Get current state
     old_count = count_records("kalshi_positions")
     old_pnl = get_total_pnl()
@@ -56,79 +72,120 @@ def main():
     
     # Refresh positions using bulk insert
     print("\nFetching latest positions from API...")
+    # Fetch latest holdings
+    holdings_data = get_user_holdings()
+    if not holdings_data:
+        print("\n✗ Failed to fetch holdings data from API.")
+        print("Check your KALSHI-ACCESS-KEY and KALSHI-ACCESS-SIGNATURE in .env file.")
+        print("Get your credentials at: https://kalshi.com/settings/api")
+        return False
+    
+    market_count = len(holdings_data.get('market_positions', []))
+    print(f"✓ Fetched portfolio data ({market_count} market positions)")
+    
+    # Process and enrich with series info
+    print("Processing holdings and fetching series information...")
+    enriched_positions = process_holdings_with_series_info(holdings_data, persist_metadata=True)
+    
+    if not enriched_positions:
+        print("\n⚠️  No active positions found (all positions may be closed).")
+        print("   Stored positions will be removed; profile metrics are still updated.")
+    
+    print(f"✓ Processed {len(enriched_positions)} positions with series info")
+    
+    # Reconcile positions and read back the aggregates in one transaction;
+    # only changed rows are written, and readers never see a partial update
+    print(f"\nSyncing {len(enriched_positions)} positions with database...")
     try:
-        # Fetch latest holdings
-        holdings_data = get_user_holdings()
-        if not holdings_data:
-            print("\n✗ Failed to fetch holdings data from API.")
-            print("Check your KALSHI-ACCESS-KEY and KALSHI-ACCESS-SIGNATURE in .env file.")
-            print("Get your credentials at: https://kalshi.com/settings/api")
-            return
-        
-        market_count = len(holdings_data.get('market_positions', []))
-        print(f"✓ Fetched portfolio data ({market_count} market positions)")
-        
-        # Process and enrich with series info
-        print("Processing holdings and fetching series information...")
-        enriched_positions = process_holdings_with_series_info(holdings_data)
-        
-        if not enriched_positions:
-            print("\n⚠️  No active positions found (all positions may be closed).")
-            print("   Skipping position table update but will still update profile metrics.")
-        
-        print(f"✓ Processed {len(enriched_positions)} positions with series info")
-        
-        # Clear existing data
-        print("\nClearing existing positions from database...")
-        truncate_table("kalshi_positions")
-        print("✓ Table cleared")
-        
-        # Bulk insert fresh data
-        print(f"Inserting {len(enriched_positions)} positions using bulk insert...")
-        if insert_positions_bulk(enriched_positions):
+        with transaction():
+            counts = sync_positions(enriched_positions)
             new_count = count_records("kalshi_positions")
             new_pnl = get_total_pnl()
-            pnl_change = new_pnl - old_pnl
-            
-            print(f"\n✓ Positions updated successfully!")
-            print(f"  New position count: {new_count}")
-            print(f"  New total P&L: ${new_pnl / 100:.2f}")
-            
-            if pnl_change != 0:
-                change_symbol = "+" if pnl_change > 0 else ""
-                change_emoji = "📈" if pnl_change > 0 else "📉"
-                print(f"  P&L Change: {change_symbol}${pnl_change / 100:.2f} {change_emoji}")
-            
-            # Print detailed summary
-            print_positions_summary()
-        else:
-            print("\n✗ Failed to insert positions into database.")
-        
-        # Update profile metrics
-        print("\n" + "="*80)
-        print("UPDATING PROFILE METRICS")
-        print("="*80 + "\n")
-        
-        print("Fetching profile metrics from API...")
-        profile_metrics = fetch_profile_metrics("Turtlecap")
-        
-        if profile_metrics:
-            print(f"✓ Fetched profile metrics:")
-            print(f"  P&L: ${profile_metrics['pnl'] / 100:.2f}")
-            print(f"  Volume: ${profile_metrics['volume'] / 100:.2f}")
-            print(f"  Open Interest: ${profile_metrics['open_interest'] / 100:.2f}")
-            print(f"  Markets Traded: {profile_metrics['num_markets_traded']}")
-            
-            if upsert_profile_metrics(profile_metrics):
-                print("✓ Profile metrics updated in database")
-            else:
-                print("✗ Failed to update profile metrics")
-        else:
-            print("✗ Failed to fetch profile metrics from API")
-            
+        print(f"✓ Rows changed: {counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['deleted']} deleted ({counts['unchanged']} unchanged)")
+    except Exception as e:
+        print(f"\n✗ Failed to update positions (previous rows kept): {e}")
+        return False
+    
+    pnl_change = new_pnl - old_pnl
+    
+    print(f"\n✓ Positions updated successfully!")
+    print(f"  New position count: {new_count}")
+    print(f"  New total P&L: ${new_pnl / 100:.2f}")
+    
+    if pnl_change != 0:
+        change_symbol = "+" if pnl_change > 0 else ""
+        change_emoji = "📈" if pnl_change > 0 else "📉"
+        print(f"  P&L Change: {change_symbol}${pnl_change / 100:.2f} {change_emoji}")
+    
+    # Print detailed summary
+    print_positions_summary()
+    return True
+
+
+def update_fills() -> bool:
+    """Sync the fills ledger (only fills newer than the stored high-water mark)."""
+    print("\nSyncing fills ledger...")
+    try:
+        new_fills = sync_fills()
+        volume = get_ledger_volume()
+        print(f"✓ Stored {new_fills} new fills ({volume['fills']} total, "
+              f"volume ${volume['volume'] / 100:.2f})")
+        return True
     except Exception as e:
-        print(f"\n✗ Error during position update: {e}")
-        print("Check your API configuration and database connection.")
+        print(f"✗ Failed to sync fills ledger: {e}")
+        return False
+
+
+def update_profile() -> bool:
+    """Fetch public profile metrics and store them."""
+    print("\n" + "="*80)
+    print("UPDATING PROFILE METRICS")
+    print("="*80 + "\n")
+    
+    print("Fetching profile metrics from API...")
+    profile_metrics = fetch_profile_metrics("Turtlecap")
+    
+    if not profile_metrics:
+        print("✗ Failed to fetch profile metrics from API")
+        return False
+    
+    print(f"✓ Fetched profile metrics:")
+    print(f"  P&L: ${profile_metrics['pnl'] / 100:.2f}")
+    print(f"  Volume: ${profile_metrics['volume'] / 100:.2f}")
+    print(f"  Open Interest: ${profile_metrics['open_interest'] / 100:.2f}")
+    print(f"  Markets Traded: {profile_metrics['num_markets_traded']}")
+    
+    if upsert_profile_metrics(profile_metrics):
+        print("✓ Profile metrics updated in database")
+        return True
+    print("✗ Failed to update profile metrics")
+    return False
+
+
+def main():
+    """
+    Main function to update Kalshi positions.
+    Can be run on a schedule (e.g., hourly via cron or Heroku Scheduler).
+    """
+    print("\n" + "="*80)
+    print("KALSHI POSITION UPDATE - Starting...")
+    print("="*80 + "\n")
+    
+    # Ensure tables exist
+    if not ensure_tables():
+        return
+    
+    # Positions, fills and profile metrics are independent; one failing doesn't stop the others
+    for step in (update_positions, update_fills, update_profile):
+        try:
+            step()
+        except Exception as e:
+            print(f"\n✗ Error during {step.__name__}: {e}")
+            print("Check your API configuration and database connection.")
+
+    print_pool_stats()
+    print_latency_report()
 
 
 if __name__ == "__main__":
@@ -10,14 +10,20 @@ from db_helpers import (
     query_table, 
     update_record,
     delete_record,
-    truncate_table,
     table_exists,
     count_records,
-    execute_query
+    execute_query,
+    execute_many,
+    bulk_load,
+    transaction,
+    get_db_connection
 )
-from kalshi import get_user_holdings, process_holdings_with_series_info
-from typing import List, Dict
-import requests
+from kalshi import get_user_holdings, process_holdings_with_series_info, iter_fill_pages, compute_pnl_by_ticker, fill_fee_cents
+from psycopg2.extras import RealDictCursor
+from typing import List, Dict, Iterator, Optional
+from datetime import datetime
+import http_client
+import kalshi_cache
 
 
 def create_kalshi_profile_table() -> bool:
@@ -59,7 +65,7 @@ def fetch_profile_metrics(nickname: str = "Turtlecap") -> Dict:
     url = f"https://api.elections.kalshi.com/v1/social/profile/metrics?nickname={nickname}&since_day_before=0"
     
     try:
-        response = requests.get(url, headers={'Content-Type': 'application/json'})
+        response = http_client.get(url, headers={'Content-Type': 'application/json'})
         response.raise_for_status()
         data = response.json()
         
@@ -192,7 +198,7 @@ def insert_position(position_data: Dict) -> bool:
 
 def insert_positions_bulk(positions: List[Dict]) -> bool:
     """
-    Insert multiple positions into the database.
+    Insert multiple positions into the database with a single COPY.
     
     Args:
         positions: List of position dictionaries
@@ -207,6 +213,67 @@ def insert_positions_bulk(positions: List[Dict]) -> bool:
     return insert_many("kalshi_positions", positions)
 
 
+def _normalize_position_value(value):
+    """Normalize a value for change detection (DB integers vs computed floats)."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def sync_positions(positions: List[Dict]) -> Dict[str, int]:
+    """
+    Reconcile kalshi_positions with freshly enriched positions, writing only the delta.
+    
+    Current rows are loaded keyed by market_id and compared with the new
+    positions; new markets are inserted, changed rows are updated (and get a
+    fresh last_updated), and markets no longer held are deleted, all in one
+    transaction. Unchanged rows are not rewritten.
+    
+    Args:
+        positions: List of enriched position dictionaries
+        
+    Returns:
+        Dictionary with 'inserted', 'updated', 'deleted' and 'unchanged' counts
+    """
+    incoming = {position['market_id']: position for position in positions}
+    
+    with transaction():
+        current_rows = execute_query(
+            "SELECT * FROM kalshi_positions FOR UPDATE;", fetch=True, use_dict=True
+        ) or []
+        current = {row['market_id']: row for row in current_rows}
+        
+        inserts = [position for market_id, position in incoming.items() if market_id not in current]
+        updates = [
+            position for market_id, position in incoming.items()
+            if market_id in current and any(
+                _normalize_position_value(value) != _normalize_position_value(current[market_id].get(column))
+                for column, value in position.items()
+            )
+        ]
+        deletes = [market_id for market_id in current if market_id not in incoming]
+        
+        if inserts:
+            columns = list(inserts[0].keys())
+            bulk_load("kalshi_positions", columns, [tuple(p[col] for col in columns) for p in inserts])
+        
+        if updates:
+            columns = [col for col in updates[0].keys() if col != 'market_id']
+            set_clause = ", ".join(f"{col} = %s" for col in columns)
+            query = f"UPDATE kalshi_positions SET {set_clause}, last_updated = CURRENT_TIMESTAMP WHERE market_id = %s;"
+            execute_many(query, [tuple(p[col] for col in columns) + (p['market_id'],) for p in updates])
+        
+        if deletes:
+            execute_query("DELETE FROM kalshi_positions WHERE market_id = ANY(%s);", (deletes,))
+    
+    return {
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deleted': len(deletes),
+        'unchanged': len(incoming) - len(inserts) - len(updates)
+    }
+
+
 def update_position_by_market_id(market_id: str, updates: Dict) -> int:
     """
     Update a position by market ID.
@@ -288,12 +355,14 @@ def get_pnl_by_series() -> List[Dict]:
 def refresh_positions() -> bool:
     """
     Refresh all positions by fetching latest data from API.
-    Clears existing data and inserts fresh data.
+    Only inserts, updates and deletes the rows that changed (see sync_positions).
     
     Returns:
         True if successful, False otherwise
     """
     try:
+        kalshi_cache.create_kalshi_series_cache_table()
+
         # Fetch latest holdings
         holdings_data = get_user_holdings()
         if not holdings_data:
@@ -301,17 +370,17 @@ def refresh_positions() -> bool:
             return False
         
         # Process and enrich with series info
-        enriched_positions = process_holdings_with_series_info(holdings_data)
+        enriched_positions = process_holdings_with_series_info(holdings_data, persist_metadata=True)
         
         if not enriched_positions:
             print("No positions to update")
             return False
         
-        # Clear existing data
-        truncate_table("kalshi_positions")
-        
-        # Insert fresh data
-        return insert_positions_bulk(enriched_positions)
+        # Apply only the changed rows in one transaction
+        counts = sync_positions(enriched_positions)
+        print(f"Positions synced: {counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+        return True
         
     except Exception as e:
         print(f"Error refreshing positions: {e}")
@@ -331,6 +400,168 @@ def delete_position_by_market_id(market_id: str) -> int:
     return delete_record("kalshi_positions", "market_id = %s", (market_id,))
 
 
+# ============= FILLS LEDGER =============
+
+FILL_COLUMNS = [
+    "fill_id", "trade_id", "order_id", "ticker", "side", "action",
+    "count", "yes_price", "no_price", "is_taker", "created_time", "fee"
+]
+
+
+def create_kalshi_fills_table() -> bool:
+    """
+    Create the kalshi_fills ledger table (one row per fill).
+    
+    Table Schema:
+    - fill_id: Unique fill identifier (falls back to trade_id)
+    - trade_id: Trade identifier
+    - order_id: Order that produced the fill
+    - ticker: Market ticker
+    - side: 'yes' or 'no'
+    - action: 'buy' or 'sell'
+    - count: Number of contracts
+    - yes_price: YES price in cents
+    - no_price: NO price in cents
+    - is_taker: Whether the fill took liquidity
+    - created_time: When the fill happened
+    - fee: Fee charged on the fill in cents
+    - synced_at: When the row was written
+    """
+    schema = {
+        "fill_id": "VARCHAR(255) PRIMARY KEY",
+        "trade_id": "VARCHAR(255)",
+        "order_id": "VARCHAR(255)",
+        "ticker": "VARCHAR(255) NOT NULL",
+        "side": "VARCHAR(10)",
+        "action": "VARCHAR(10)",
+        "count": "INTEGER",
+        "yes_price": "INTEGER",
+        "no_price": "INTEGER",
+        "is_taker": "BOOLEAN",
+        "created_time": "TIMESTAMPTZ",
+        "fee": "INTEGER",
+        "synced_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+    }
+    
+    if not create_table("kalshi_fills", schema):
+        return False
+    
+    try:
+        execute_query("CREATE INDEX IF NOT EXISTS kalshi_fills_ticker_idx ON kalshi_fills (ticker);")
+        execute_query("CREATE INDEX IF NOT EXISTS kalshi_fills_created_time_idx ON kalshi_fills (created_time);")
+        return True
+    except Exception as e:
+        print(f"Error creating kalshi_fills indexes: {e}")
+        return False
+
+
+def _fill_to_row(fill: Dict) -> tuple:
+    """Map an API fill onto FILL_COLUMNS order."""
+    return (
+        fill.get('fill_id') or fill.get('trade_id'),
+        fill.get('trade_id'),
+        fill.get('order_id'),
+        fill.get('ticker') or fill.get('market_ticker'),
+        fill.get('side'),
+        fill.get('action'),
+        fill.get('count', 0),
+        fill.get('yes_price', 0),
+        fill.get('no_price', 0),
+        fill.get('is_taker'),
+        fill.get('created_time'),
+        fill_fee_cents(fill)
+    )
+
+
+def get_fills_high_water_mark() -> Optional[datetime]:
+    """
+    Get the timestamp of the newest fill stored in the ledger.
+    
+    Returns:
+        Newest created_time, or None if the ledger is empty
+    """
+    result = execute_query("SELECT MAX(created_time) FROM kalshi_fills;", fetch_one=True)
+    return result[0] if result and result[0] else None
+
+
+def sync_fills() -> int:
+    """
+    Incrementally sync the fills ledger from the API.
+    Only fills at or after the stored high-water mark are requested; pages are
+    written as they arrive inside one transaction, so a failed page leaves the
+    ledger (and its high-water mark) untouched.
+    
+    Returns:
+        Number of new fills stored
+    """
+    high_water_mark = get_fills_high_water_mark()
+    # The high-water-mark second itself is re-read; duplicates are ignored on insert
+    min_ts = int(high_water_mark.timestamp()) if high_water_mark else None
+    
+    new_fills = 0
+    with transaction():
+        for page in iter_fill_pages(min_ts=min_ts):
+            rows = [_fill_to_row(fill) for fill in page if fill.get('fill_id') or fill.get('trade_id')]
+            new_fills += bulk_load("kalshi_fills", FILL_COLUMNS, rows, conflict_columns=["fill_id"])
+    
+    return new_fills
+
+
+def iter_ledger_fills(ticker: Optional[str] = None, batch_size: int = 2000) -> Iterator[Dict]:
+    """
+    Stream fills from the ledger in time order through a server-side cursor,
+    so only batch_size rows are held in memory at once.
+    
+    Args:
+        ticker: Optional ticker to restrict the stream to
+        batch_size: Rows fetched per round trip
+    """
+    query = f"SELECT {', '.join(FILL_COLUMNS)} FROM kalshi_fills"
+    params = None
+    if ticker:
+        query += " WHERE ticker = %s"
+        params = (ticker,)
+    query += " ORDER BY created_time, fill_id;"
+    
+    with get_db_connection() as (conn, _):
+        with conn.cursor(name="kalshi_fills_stream", cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+
+
+def get_ledger_pnl_engine(current_prices: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+    """
+    Run the single-pass P&L engine (kalshi.compute_pnl_by_ticker) over the whole ledger.
+    
+    Args:
+        current_prices: Optional ticker: current YES price in cents for unrealized P&L
+        
+    Returns:
+        Dictionary of ticker: P&L breakdown with cost basis and realized/unrealized P&L
+    """
+    return compute_pnl_by_ticker(iter_ledger_fills(), current_prices)
+
+
+def get_ledger_volume() -> Dict:
+    """
+    Get traded volume from the local fills ledger.
+    
+    Returns:
+        Dictionary with total contracts, total volume in cents and fill count
+    """
+    query = """
+        SELECT
+            COUNT(*) AS fills,
+            COALESCE(SUM(count), 0) AS contracts,
+            COALESCE(SUM(count * CASE WHEN side = 'yes' THEN yes_price ELSE no_price END), 0) AS volume
+        FROM kalshi_fills;
+    """
+    result = execute_query(query, fetch_one=True, use_dict=True)
+    return dict(result) if result else {'fills': 0, 'contracts': 0, 'volume': 0}
+
+
 def print_positions_summary():
     """
     Print a summary of all positions.
@@ -0,0 +1,273 @@
+"""
+Update Orchestrator
+Runs the stages of final.py, hourly.py and kalshi_hourly.py as one asyncio
+graph: stages declare their dependencies, independent stages run
+concurrently in worker threads with per-stage timeouts, and a failing stage
+only skips the stages that depend on it. At most STAGE_MAX_CONCURRENCY
+stages (default: the DB pool size) run at once across the whole process,
+however many run_stages() calls (e.g. scheduler jobs) are active.
+
+A stage that times out can't be interrupted: its daemon thread keeps
+running (and keeps its concurrency slot) until the function returns, and
+is reported as still running. Exiting the process abandons such threads.
+
+Usage:
+    python orchestrator.py                  # every stage
+    python orchestrator.py songs kalshi_profile   # selected stages (plus dependencies)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import final
+import hourly
+import kalshi_hourly
+from portfolio_operations import create_fingerprints_table
+from db_helpers import get_pool, print_pool_stats
+from http_client import print_latency_report
+
+DEFAULT_STAGE_TIMEOUT = float(os.getenv("STAGE_TIMEOUT_SECONDS", "300"))
+# Stages running at once (0 = the DB pool size, so each stage can get a connection)
+STAGE_MAX_CONCURRENCY = int(os.getenv("STAGE_MAX_CONCURRENCY", "0"))
+# How often a stage waiting for a slot checks again
+SLOT_POLL_SECONDS = 0.05
+
+
+class Stage:
+    """
+    One unit of work in the update graph.
+
+    A stage fails if its function raises, times out or returns False.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Optional[bool]],
+                 depends_on: Sequence[str] = (), timeout: float = DEFAULT_STAGE_TIMEOUT):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+
+
+class StageResult:
+    """Outcome of one stage: ok, failed, timeout or skipped."""
+
+    def __init__(self, name: str, status: str, seconds: float = 0.0, error: Optional[str] = None,
+                 future: Optional[Future] = None):
+        self.name = name
+        self.status = status
+        self.seconds = seconds
+        self.error = error
+        self.future = future
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def still_running(self) -> bool:
+        """True while the thread of a timed-out stage hasn't returned yet."""
+        return self.future is not None and not self.future.done()
+
+
+# Futures of stage threads that haven't returned, including timed-out ones
+_in_flight: Dict[Future, str] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _start_stage_thread(stage: Stage) -> Future:
+    """Run stage.func on a daemon thread and return a Future for its result."""
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def target():
+        try:
+            future.set_result(stage.func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(future, None)
+
+    with _in_flight_lock:
+        _in_flight[future] = stage.name
+    threading.Thread(target=target, name=f"stage-{stage.name}", daemon=True).start()
+    return future
+
+
+# Concurrency slots shared by every run_stages() call in the process
+_stage_slots: Optional[threading.BoundedSemaphore] = None
+_stage_slots_lock = threading.Lock()
+
+
+def _shared_stage_slots() -> threading.BoundedSemaphore:
+    """Return the process-wide stage slots, sized on first use."""
+    global _stage_slots
+    with _stage_slots_lock:
+        if _stage_slots is None:
+            _stage_slots = threading.BoundedSemaphore(STAGE_MAX_CONCURRENCY or get_pool().maxconn)
+        return _stage_slots
+
+
+async def _acquire_slot(slots: threading.BoundedSemaphore):
+    """Wait for a slot without blocking the event loop (other jobs' loops share the slots)."""
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(SLOT_POLL_SECONDS)
+
+
+def running_stages() -> List[str]:
+    """Names of stages whose threads are still running (e.g. after a timeout)."""
+    with _in_flight_lock:
+        return list(_in_flight.values())
+
+
+def wait_for_stage_threads(futures: Optional[Iterable[Future]] = None,
+                           timeout: Optional[float] = None) -> bool:
+    """
+    Wait for stage threads to return (default: every one still running).
+
+    Returns:
+        True if they all finished within the timeout
+    """
+    if futures is None:
+        with _in_flight_lock:
+            futures = list(_in_flight)
+    _, not_done = wait(list(futures), timeout=timeout)
+    return not not_done
+
+
+STAGES = [
+    Stage("portfolio_schema", create_fingerprints_table),
+    Stage("repos", final.refresh_repos, depends_on=["portfolio_schema"]),
+    Stage("songs", final.refresh_songs, depends_on=["portfolio_schema"]),
+    Stage("wakatime", hourly.update_wakatime),
+    Stage("oura", hourly.update_oura, timeout=600),
+    Stage("kalshi_schema", kalshi_hourly.ensure_tables),
+    Stage("kalshi_positions", kalshi_hourly.update_positions, depends_on=["kalshi_schema"]),
+    Stage("kalshi_fills", kalshi_hourly.update_fills, depends_on=["kalshi_schema"], timeout=600),
+    Stage("kalshi_profile", kalshi_hourly.update_profile, depends_on=["kalshi_schema"]),
+]
+
+
+def select_stages(names: Iterable[str], stages: List[Stage] = STAGES) -> List[Stage]:
+    """
+    Return the named stages plus everything they depend on, in declaration order.
+
+    Raises:
+        ValueError: If a name or dependency is unknown
+    """
+    by_name = {stage.name: stage for stage in stages}
+    wanted = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise ValueError(f"Unknown stage '{name}' (known: {', '.join(by_name)})")
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(by_name[name].depends_on)
+    return [stage for stage in stages if stage.name in wanted]
+
+
+async def _run_stage(stage: Stage, tasks: Dict[str, "asyncio.Task"],
+                     slots: threading.BoundedSemaphore) -> StageResult:
+    for dependency in stage.depends_on:
+        result = await tasks[dependency]
+        if not result.ok:
+            return StageResult(stage.name, "skipped", error=f"{dependency} {result.status}")
+
+    # The slot is freed when the thread returns, not when the stage times out
+    await _acquire_slot(slots)
+    future = _start_stage_thread(stage)
+    future.add_done_callback(lambda _: slots.release())
+
+    started = time.perf_counter()
+    try:
+        returned = await asyncio.wait_for(asyncio.wrap_future(future), stage.timeout)
+    except asyncio.TimeoutError:
+        # The thread can't be interrupted; HTTP timeouts bound how long it lingers
+        return StageResult(stage.name, "timeout", time.perf_counter() - started,
+                           f"exceeded {stage.timeout:g}s", future=future)
+    except Exception as e:
+        return StageResult(stage.name, "failed", time.perf_counter() - started, str(e))
+
+    status = "failed" if returned is False else "ok"
+    return StageResult(stage.name, status, time.perf_counter() - started)
+
+
+async def run_stages(stages: List[Stage], max_concurrency: Optional[int] = None) -> List[StageResult]:
+    """
+    Run stages concurrently, each starting as soon as its dependencies succeed
+    and a concurrency slot is free.
+
+    Args:
+        stages: Stages to run
+        max_concurrency: Stages of this call running at once; by default the
+            slots shared by the whole process (STAGE_MAX_CONCURRENCY, else the
+            DB pool size) are used
+
+    Returns:
+        One StageResult per stage, in the order given
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.depends_on if dep not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unselected stage(s): {', '.join(missing)}")
+
+    slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else _shared_stage_slots()
+    tasks: Dict[str, asyncio.Task] = {}
+    # Tasks are created before any of them runs, so every dependency lookup succeeds
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(_run_stage(stage, tasks, slots))
+    return list(await asyncio.gather(*tasks.values()))
+
+
+def print_timing_report(results: List[StageResult], wall_seconds: float):
+    """Print per-stage status and duration against the total wall-clock time."""
+    print("\n" + "=" * 60)
+    print("STAGE TIMINGS")
+    print("=" * 60)
+    for result in sorted(results, key=lambda r: r.seconds, reverse=True):
+        line = f"  {result.name:<18} {result.status:<8} {result.seconds:7.2f}s"
+        error = result.error
+        if result.still_running:
+            error += "; still running"
+        if error:
+            line += f"  ({error})"
+        print(line)
+    stage_total = sum(result.seconds for result in results)
+    print(f"\n  Wall clock: {wall_seconds:.2f}s (sum of stages {stage_total:.2f}s)")
+
+
+def run(names: Optional[Iterable[str]] = None) -> List[StageResult]:
+    """
+    Run the selected stages (default: all) and print timings and pool/HTTP stats.
+
+    Returns:
+        One StageResult per stage that was selected
+    """
+    stages = select_stages(names) if names else list(STAGES)
+    print(f"--- Running {len(stages)} stage(s): {', '.join(stage.name for stage in stages)} ---")
+
+    started = time.perf_counter()
+    results = asyncio.run(run_stages(stages))
+    print_timing_report(results, time.perf_counter() - started)
+
+    print_pool_stats()
+    print_latency_report()
+    return results
+
+
+def main():
+    results = run(sys.argv[1:] or None)
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from db_helpers import execute_query, get_db_connection
+from db_helpers import execute_query, get_db_connection, bulk_load, commit
+from psycopg2.extras import execute_values
+from typing import Dict, List, Tuple
 import json
 from datetime import datetime
 
@@ -51,6 +53,61 @@ def upsert_oura_data(data_type: str, date_str: str, json_data: dict):
         print(f"❌ Error saving {data_type} for {date_str}: {e}")
         return False
 
+def upsert_oura_batch(data_type: str, rows: List[Tuple[str, dict]]) -> Dict[str, int]:
+    """
+    Insert or update all documents of one data type in a single statement.
+    Rows whose JSON is unchanged are left untouched, and RETURNING reports
+    whether each written row was inserted or updated.
+
+    Args:
+        data_type: Oura data type key (e.g. "activity")
+        rows: List of (date_str, json_data) tuples; later rows win for a repeated date
+
+    Returns:
+        Dictionary with 'inserted', 'updated', 'unchanged' and 'total' counts
+
+    Raises:
+        psycopg2.Error: If the write failed (nothing is saved)
+    """
+    by_date = {}
+    for date_str, json_data in rows:
+        if json_data:
+            by_date[date_str] = json_data
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'total': len(by_date)}
+    if not by_date:
+        return counts
+
+    query = """
+    INSERT INTO oura_data (data_type, date, data)
+    VALUES %s
+    ON CONFLICT (data_type, date)
+    DO UPDATE SET
+        data = EXCLUDED.data,
+        created_at = CURRENT_TIMESTAMP
+    WHERE oura_data.data IS DISTINCT FROM EXCLUDED.data
+    RETURNING (xmax = 0) AS inserted;
+    """
+    values = [(data_type, date_str, json.dumps(json_data)) for date_str, json_data in by_date.items()]
+
+    try:
+        with get_db_connection() as (conn, cursor):
+            results = execute_values(
+                cursor, query, values,
+                template="(%s, %s::date, %s::jsonb)",
+                page_size=len(values),
+                fetch=True
+            )
+            commit(conn)
+    except Exception as e:
+        print(f"❌ Error saving {data_type} batch of {len(values)}: {e}")
+        raise
+
+    counts['inserted'] = sum(1 for (inserted,) in results if inserted)
+    counts['updated'] = len(results) - counts['inserted']
+    counts['unchanged'] = counts['total'] - len(results)
+    return counts
+
 def get_oura_data(data_type: str, start_date: str, end_date: str):
     """Get Oura data for a date range."""
     query = """
@@ -65,3 +122,182 @@ def get_oura_data(data_type: str, start_date: str, end_date: str):
     except Exception as e:
         print(f"❌ Error fetching {data_type}: {e}")
         return []
+
+def create_heart_rate_table():
+    """
+    Create the oura_heart_rate table: one narrow row per heart-rate sample.
+    Samples never change once recorded, so the table is append-only and a
+    re-fetched sample is simply skipped on its timestamp.
+    """
+    query = """
+    CREATE TABLE IF NOT EXISTS oura_heart_rate (
+        timestamp TIMESTAMPTZ PRIMARY KEY,
+        bpm SMALLINT NOT NULL,
+        source VARCHAR(20) NOT NULL
+    );
+    """
+    try:
+        execute_query(query)
+        return True
+    except Exception as e:
+        print(f"❌ Error creating table 'oura_heart_rate': {e}")
+        return False
+
+def insert_heart_rate(points: List[dict]) -> int:
+    """
+    Append heart-rate samples, skipping timestamps already stored.
+    Rows are streamed via COPY and merged with ON CONFLICT DO NOTHING.
+
+    Args:
+        points: Oura heart-rate documents ({bpm, source, timestamp})
+
+    Returns:
+        Number of new samples stored
+
+    Raises:
+        psycopg2.Error: If the write failed (nothing is saved)
+    """
+    rows = [(point['timestamp'], point['bpm'], point['source']) for point in points]
+    if not rows:
+        return 0
+
+    try:
+        return bulk_load("oura_heart_rate", ["timestamp", "bpm", "source"], rows,
+                         conflict_columns=["timestamp"])
+    except Exception as e:
+        print(f"❌ Error saving {len(rows)} heart rate samples: {e}")
+        raise
+
+def migrate_heart_rate_blobs() -> int:
+    """
+    Copy the per-day heart_rate blobs in oura_data into oura_heart_rate.
+    Safe to rerun; the blobs themselves are left in place.
+
+    Returns:
+        Number of samples copied
+    """
+    query = """
+    INSERT INTO oura_heart_rate (timestamp, bpm, source)
+    SELECT (point->>'timestamp')::timestamptz, (point->>'bpm')::smallint, point->>'source'
+    FROM oura_data, jsonb_array_elements(data->'data') AS point
+    WHERE data_type = 'heart_rate'
+    ON CONFLICT (timestamp) DO NOTHING;
+    """
+    try:
+        with get_db_connection() as (conn, cursor):
+            cursor.execute(query)
+            copied = cursor.rowcount
+            commit(conn)
+            return copied
+    except Exception as e:
+        print(f"❌ Error migrating heart rate blobs: {e}")
+        return 0
+
+def create_backfill_checkpoints_table():
+    """
+    Create the oura_backfill_checkpoints table.
+    One row per (endpoint, date range) chunk of a backfill. It doubles as the
+    backfill work queue: chunks are queued as 'pending' and marked 'done',
+    'partial' (fetched, but covering days Oura may still update) or 'failed',
+    so an interrupted backfill resumes with the unfinished ones.
+    """
+    query = """
+    CREATE TABLE IF NOT EXISTS oura_backfill_checkpoints (
+        endpoint VARCHAR(50) NOT NULL,
+        chunk_start DATE NOT NULL,
+        chunk_end DATE NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        records INTEGER DEFAULT 0,
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (endpoint, chunk_start, chunk_end)
+    );
+    """
+    try:
+        execute_query(query)
+        return True
+    except Exception as e:
+        print(f"❌ Error creating checkpoints table: {e}")
+        return False
+
+def enqueue_chunks(chunks: List[Tuple[str, str, str]]) -> int:
+    """
+    Add backfill chunks to the work queue as 'pending'; chunks already queued
+    (whatever their status) are left untouched.
+
+    Args:
+        chunks: List of (endpoint, chunk_start, chunk_end) tuples
+
+    Returns:
+        Number of newly queued chunks
+    """
+    if not chunks:
+        return 0
+
+    query = """
+    INSERT INTO oura_backfill_checkpoints (endpoint, chunk_start, chunk_end, status)
+    VALUES %s
+    ON CONFLICT (endpoint, chunk_start, chunk_end) DO NOTHING;
+    """
+    try:
+        with get_db_connection() as (conn, cursor):
+            execute_values(cursor, query, chunks, template="(%s, %s::date, %s::date, 'pending')",
+                           page_size=1000)
+            queued = cursor.rowcount
+            commit(conn)
+            return queued
+    except Exception as e:
+        print(f"❌ Error queueing {len(chunks)} backfill chunks: {e}")
+        return 0
+
+def get_pending_chunks(endpoints: List[str], start_date: str, end_date: str,
+                       skip_statuses: Tuple[str, ...] = ('done',)) -> List[Tuple[str, str, str]]:
+    """
+    Get the queued chunks that still need fetching, oldest first. A chunk
+    lying inside another finished chunk of the same endpoint (e.g. a
+    clipped first partition after the range moved) counts as finished.
+
+    Args:
+        skip_statuses: Statuses that count as finished (default: only 'done')
+
+    Returns:
+        List of (endpoint, chunk_start, chunk_end) with ISO date strings
+    """
+    query = """
+    SELECT endpoint, chunk_start, chunk_end FROM oura_backfill_checkpoints chunk
+    WHERE endpoint = ANY(%(endpoints)s) AND status <> ALL(%(skip)s)
+    AND chunk_start >= %(start)s AND chunk_end <= %(end)s
+    AND NOT EXISTS (
+        SELECT 1 FROM oura_backfill_checkpoints finished
+        WHERE finished.endpoint = chunk.endpoint AND finished.status = ANY(%(skip)s)
+        AND finished.chunk_start <= chunk.chunk_start AND finished.chunk_end >= chunk.chunk_end
+    )
+    ORDER BY chunk_start, endpoint;
+    """
+    params = {'endpoints': list(endpoints), 'skip': list(skip_statuses), 'start': start_date, 'end': end_date}
+    try:
+        rows = execute_query(query, params, fetch=True)
+        return [(endpoint, str(chunk_start), str(chunk_end)) for endpoint, chunk_start, chunk_end in rows or []]
+    except Exception as e:
+        print(f"❌ Error reading backfill queue: {e}")
+        return []
+
+def mark_chunk(endpoint: str, chunk_start: str, chunk_end: str, status: str,
+               records: int = 0, error: str = None):
+    """Record the outcome of one backfill chunk (attempts count every call)."""
+    query = """
+    INSERT INTO oura_backfill_checkpoints (endpoint, chunk_start, chunk_end, status, records, attempts, last_error)
+    VALUES (%s, %s, %s, %s, %s, 1, %s)
+    ON CONFLICT (endpoint, chunk_start, chunk_end)
+    DO UPDATE SET
+        status = EXCLUDED.status,
+        records = EXCLUDED.records,
+        attempts = oura_backfill_checkpoints.attempts + 1,
+        last_error = EXCLUDED.last_error,
+        updated_at = CURRENT_TIMESTAMP;
+    """
+    try:
+        execute_query(query, (endpoint, chunk_start, chunk_end, status, records, error))
+    except Exception as e:
+        print(f"❌ Error saving checkpoint for {endpoint} {chunk_start}..{chunk_end}: {e}")
@@ -1,16 +1,26 @@
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 import os
 import json
+import threading
+import http_client
+import oura_sync
 from token_manager import TokenManager
-from oura_db import create_oura_table, upsert_oura_data, get_oura_data
+from oura_db import create_oura_table, create_heart_rate_table, upsert_oura_data
 
 OURA_CLIENT_ID = os.getenv("OURA_CLIENT_ID")
 OURA_CLIENT_SECRET = os.getenv("OURA_CLIENT_SECRET")
 
+# Concurrent requests against the Oura API (the shared session's pool is sized to match)
+OURA_MAX_WORKERS = int(os.getenv("OURA_MAX_WORKERS", "4"))
+
 class OuraClient:
-    """Client for Oura V2 API with automated token management."""
+    """
+    Client for Oura V2 API with automated token management.
+    Safe to share between threads: concurrent 401s trigger a single token refresh.
+    """
     
     BASE_URL = "https://api.ouraring.com/v2"
 
@@ -19,6 +29,12 @@ class OuraClient:
         self.client_secret = client_secret
         self.token_manager = TokenManager("oura")
         self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=OURA_MAX_WORKERS))
+        # Bumped on every refresh, so threads that saw the same 401 refresh only once
+        self._token_generation = 0
+        self._token_lock = threading.Lock()
+        self._stats = {'requests': 0, 'pages_fetched': 0, 'bytes_fetched': 0}
+        self._stats_lock = threading.Lock()
         self._load_tokens()
 
     def _load_tokens(self):
@@ -62,17 +78,35 @@ class OuraClient:
         self._save_tokens(new_tokens)
         print("✅ Token refreshed successfully.")
 
+    def _refresh_token_once(self, seen_generation: int):
+        """Refresh the token unless another thread already did since seen_generation."""
+        with self._token_lock:
+            if self._token_generation == seen_generation:
+                try:
+                    self._refresh_token()
+                finally:
+                    # Even a failed refresh counts, so waiting threads don't all retry it
+                    self._token_generation += 1
+
     def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None, retry: bool = True) -> Dict[str, Any]:
         if not self.tokens:
                print("❌ No tokens loaded. Cannot make request.")
                return {}
 
         url = f"{self.BASE_URL}{endpoint}"
-        response = self.session.get(url, params=params)
+        with self._token_lock:
+            generation = self._token_generation
+            headers = {"Authorization": f"Bearer {self.tokens.get('access_token')}"}
+        response = http_client.get(url, params=params, headers=headers, session=self.session,
+                                   endpoint=f"GET api.ouraring.com/v2{endpoint}")
+        
+        with self._stats_lock:
+            self._stats['requests'] += 1
+            self._stats['bytes_fetched'] += len(response.content or b"")
         
         if response.status_code == 401 and retry:
             try:
-                self._refresh_token()
+                self._refresh_token_once(generation)
                 # Retry request with new token
                 return self._get(endpoint, params, retry=False)
             except Exception as e:
@@ -86,133 +120,207 @@ class OuraClient:
 
         return response.json()
 
+    def iter_pages(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every page of a collection endpoint, following next_token.
+        
+        Raises:
+            RuntimeError: If a page request fails (so callers never mistake a
+                truncated range for a complete one)
+        """
+        params = dict(params or {})
+        page_number = 1
+        while True:
+            page = self._get(endpoint, params)
+            if not page or 'data' not in page:
+                raise RuntimeError(f"{endpoint} page {page_number} failed")
+            with self._stats_lock:
+                self._stats['pages_fetched'] += 1
+            yield page
+            
+            next_token = page.get('next_token')
+            if not next_token:
+                return
+            params['next_token'] = next_token
+            page_number += 1
+
+    def iter_documents(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the documents of a collection endpoint one at a time, across all pages."""
+        for page in self.iter_pages(endpoint, params):
+            yield from page['data']
+
+    def _get_all(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Fetch every page of a collection endpoint into one {'data': [...]} response.
+        Returns {} if any page fails, like _get.
+        """
+        try:
+            return {'data': list(self.iter_documents(endpoint, params)), 'next_token': None}
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return {}
+
+    def get_fetch_stats(self) -> Dict[str, int]:
+        """Return request, page and byte counters."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def format_fetch_stats(self) -> str:
+        """One-line summary of the fetch counters."""
+        stats = self.get_fetch_stats()
+        return (f"Oura: {stats['requests']} requests, {stats['pages_fetched']} pages, "
+                f"{stats['bytes_fetched'] / 1024:.1f} KiB fetched")
+
     def get_personal_info(self) -> Dict[str, Any]:
         """Get personal info."""
         return self._get("/usercollection/personal_info")
 
     def get_daily_sleep(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily sleep documents."""
-        return self._get("/usercollection/daily_sleep", params={
+        return self._get_all("/usercollection/daily_sleep", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_daily_activity(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily activity documents."""
-        return self._get("/usercollection/daily_activity", params={
+        return self._get_all("/usercollection/daily_activity", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_daily_readiness(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily readiness documents."""
-        return self._get("/usercollection/daily_readiness", params={
+        return self._get_all("/usercollection/daily_readiness", params={
             "start_date": start_date,
             "end_date": end_date
         })
     
     def get_daily_stress(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily stress."""
-        return self._get("/usercollection/daily_stress", params={
+        return self._get_all("/usercollection/daily_stress", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_daily_spo2(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily SpO2."""
-        return self._get("/usercollection/daily_spo2", params={
+        return self._get_all("/usercollection/daily_spo2", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_daily_resilience(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily resilience."""
-        return self._get("/usercollection/daily_resilience", params={
+        return self._get_all("/usercollection/daily_resilience", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_daily_cardiovascular_age(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get daily cardiovascular age."""
-        return self._get("/usercollection/daily_cardiovascular_age", params={
+        return self._get_all("/usercollection/daily_cardiovascular_age", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_heart_rate(self, start_datetime: str, end_datetime: str) -> Dict[str, Any]:
         """Get heart rate data."""
-        return self._get("/usercollection/heartrate", params={
+        return self._get_all("/usercollection/heartrate", params={
             "start_datetime": start_datetime,
             "end_datetime": end_datetime
         })
 
     def get_sleep_documents(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get sleep documents (detailed sleep)."""
-        return self._get("/usercollection/sleep", params={
+        return self._get_all("/usercollection/sleep", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_sleep_time(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get sleep time recommendations."""
-        return self._get("/usercollection/sleep_time", params={
+        return self._get_all("/usercollection/sleep_time", params={
             "start_date": start_date,
             "end_date": end_date
         })
     
     def get_workouts(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get workouts."""
-        return self._get("/usercollection/workout", params={
+        return self._get_all("/usercollection/workout", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_sessions(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get sessions."""
-        return self._get("/usercollection/session", params={
+        return self._get_all("/usercollection/session", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_tags(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get tags."""
-        return self._get("/usercollection/tag", params={
+        return self._get_all("/usercollection/tag", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_enhanced_tags(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get enhanced tags."""
-        return self._get("/usercollection/enhanced_tag", params={
+        return self._get_all("/usercollection/enhanced_tag", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_rest_mode_periods(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get rest mode periods."""
-        return self._get("/usercollection/rest_mode_period", params={
+        return self._get_all("/usercollection/rest_mode_period", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_ring_configuration(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get ring configuration."""
-        return self._get("/usercollection/ring_configuration", params={
+        return self._get_all("/usercollection/ring_configuration", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
     def get_vo2_max(self, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get VO2 Max."""
-        return self._get("/usercollection/vO2_max", params={
+        return self._get_all("/usercollection/vO2_max", params={
             "start_date": start_date,
             "end_date": end_date
         })
 
-def main():
+def save_personal_info(p_info: Dict[str, Any], day: str) -> Optional[str]:
+    """
+    Store the personal info snapshot under the given day.
+
+    Raises:
+        RuntimeError: If the response was empty (the request failed) or saving failed
+    """
+    if not p_info:
+        raise RuntimeError("no data (request failed)")
+
+    print(f"✅ Personal Info: Fetched.")
+    # Personal info has no date of its own, but the schema requires one;
+    # storing it under today's date keeps a history of it changing.
+    if not upsert_oura_data("personal_info", day, p_info):
+        raise RuntimeError("saving failed")
+    return None
+
+def main() -> bool:
+    """
+    Fetch and store yesterday through tomorrow for every hourly endpoint.
+
+    Returns:
+        True if every endpoint was fetched and saved
+    """
     if not OURA_CLIENT_ID or not OURA_CLIENT_SECRET:
         print("❌ Error: Environment variables OURA_CLIENT_ID and OURA_CLIENT_SECRET are required.")
-        return
+        return False
 
     client = OuraClient(OURA_CLIENT_ID, OURA_CLIENT_SECRET)
     
@@ -226,172 +334,32 @@ def main():
     start_date = yesterday.isoformat()
     end_date = tomorrow.isoformat()
 
-    # Initialize DB Table
+    # Initialize DB Tables
     create_oura_table()
+    create_heart_rate_table()
 
     print(f"Fetching Oura data from {start_date} to {end_date}...")
-    
-    # Define a helper to print results AND save to DB
-    def print_result(name, data, data_type_key=None):
-        if data and 'data' in data:
-            count = len(data['data'])
-            print(f"✅ {name}: Found {count} records.")
-            
-            # Save to DB if we have data
-            # For this "daily" style data, we'll iterate and save each day? 
-            # OR we can save the whole blob for the day range. 
-            # The schema (data_type, date) suggests saving PER DAY.
-            # Most endpoints return a list of items, each with a 'day' or 'timestamp'.
-            
-            key = data_type_key or name.lower().replace(" ", "_")
-            
-            saved_count = 0
-            for item in data['data']:
-                # extracting date
-                date_val = item.get('day')
-                if not date_val and 'timestamp' in item:
-                    date_val = item['timestamp'].split('T')[0]
-                elif not date_val and 'start_datetime' in item:
-                    date_val = item['start_datetime'].split('T')[0]
-                
-                if date_val:
-                    if upsert_oura_data(key, date_val, item):
-                        saved_count += 1
-            
-            # print(f"   Saved {saved_count}/{count} records to DB.")
-            
-        else:
-            print(f"⚠️ {name}: No data or error.")
-
-    # Fetch Activity
-    print_result("Activity", client.get_daily_activity(start_date, end_date), "activity")
-
-    # Fetch Sleep (Daily)
-    print_result("Sleep Daily", client.get_daily_sleep(start_date, end_date), "sleep_daily")
-
-    # Fetch Readiness
-    print_result("Readiness", client.get_daily_readiness(start_date, end_date), "readiness")
-
-    # Fetch Daily Stress
-    print_result("Daily Stress", client.get_daily_stress(start_date, end_date), "daily_stress")
-
-    # Fetch Daily SpO2
-    print_result("Daily SpO2", client.get_daily_spo2(start_date, end_date), "daily_spo2")
-
-    # Fetch Daily Resilience
-    print_result("Daily Resilience", client.get_daily_resilience(start_date, end_date), "daily_resilience")
-
-    # Fetch Daily Cardio Age
-    print_result("Cardio Age", client.get_daily_cardiovascular_age(start_date, end_date), "cardio_age")
-
-    # Fetch Heart Rate (requires datetime)
-    # Heart rate is high frequency. Storing every single point per row might be too much if schema was per-point.
-    # But our schema is (data_type, date, json). We can store the WHOLE LIST for the day in one row?
-    # NO, upsert_oura_data takes (data_type, date, json_data).
-    # If we loop, we overwrite the same 'date' entry repeatedly if we don't be careful?
-    # Actually, Oura Ring heart rate is many points.
-    # DECISION: For high-frequency data like HR, let's group by day and save the LIST of points for that day?
-    # OR, since the previous logic iterates: `upsert_oura_data` uses (data_type, date) as unique key.
-    # If we call it multiple times for the same day (e.g. multiple 5min samples), we would overwrite.
-    # SO, we should Group By Day first.
-    
-    # Let's write a smarter saver for HR.
-    hr_data = client.get_heart_rate(f"{start_date}T00:00:00", f"{end_date}T23:59:59")
-    if hr_data and 'data' in hr_data:
-        print(f"✅ Heart Rate: Found {len(hr_data['data'])} records.")
-        # Group by day
-        hr_by_day = {}
-        for item in hr_data['data']:
-            d = item['timestamp'].split('T')[0]
-            if d not in hr_by_day: hr_by_day[d] = []
-            hr_by_day[d].append(item)
-        
-        for d, items in hr_by_day.items():
-            # Fetch existing data for this day to merge
-            existing_records = get_oura_data("heart_rate", d, d)
-            
-            # Start with existing data points if any
-            merged_items_map = {}
-            if existing_records:
-                # Expecting existing_records[0]['data'] to be the dict we saved, which has a 'data' key with list of points
-                # API returns list of rows/tuples or dicts depending on fetch=True, use_dict=True in get_oura_data
-                # oura_db.py get_oura_data uses fetch=True, use_dict=True, so it returns list of dicts:
-                # [{'id': ..., 'data_type': 'heart_rate', 'date': ..., 'data': {'data': [...]}, ...}]
-                
-                if len(existing_records) > 0:
-                    current_db_data = existing_records[0].get('data', {})
-                    if 'data' in current_db_data:
-                        for pt in current_db_data['data']:
-                            merged_items_map[pt['timestamp']] = pt
-            
-            # Add/Overwrite with new items
-            for item in items:
-                merged_items_map[item['timestamp']] = item
-            
-            # Convert back to list and sort
-            final_items = list(merged_items_map.values())
-            final_items.sort(key=lambda x: x['timestamp'])
-            
-            print(f"   For day {d}: Merged {len(items)} new points with existing, total {len(final_items)} points.")
-            
-            upsert_oura_data("heart_rate", d, {"data": final_items}) # Wrap in dict
-    else:
-        print("⚠️ Heart Rate: No data.")
-
-
-    # Fetch Sleep Documents (Detailed)
-    print_result("Sleep Detailed", client.get_sleep_documents(start_date, end_date), "sleep_detailed")
-
-    # Fetch Sleep Time
-    print_result("Sleep Time", client.get_sleep_time(start_date, end_date), "sleep_time")
-
-    # Fetch Workouts
-    print_result("Workouts", client.get_workouts(start_date, end_date), "workout")
-
-    # Fetch Sessions
-    # print_result("Sessions", client.get_sessions(start_date, end_date), "session")
-
-    # # Fetch Tags
-    # print_result("Tags", client.get_tags(start_date, end_date), "tag")
-
-    # # Fetch Enhanced Tags
-    # print_result("Enhanced Tags", client.get_enhanced_tags(start_date, end_date), "enhanced_tag")
-
-    # # Fetch Rest Mode Periods
-    # print_result("Rest Mode", client.get_rest_mode_periods(start_date, end_date), "rest_mode_period")
-
-    # # Fetch Ring Config - REMOVED per user request
-    # # print_result("Ring Config", client.get_ring_configuration(start_date, end_date), "ring_configuration")
-
-    # # Fetch VO2 Max
-    # print_result("VO2 Max", client.get_vo2_max(start_date, end_date), "vo2_max")
-
-    # Fetch Personal Info (Singleton)
-    # Personal Info does not use start/end dates usually, it's just the current snapshot or user info.
-    # Looking at spec, it has NO parameters? Or minimal? Spec says: GET /v2/usercollection/personal_info
-    # Let's check the client method: def get_personal_info(self) -> Dict[str, Any]: return self._get("/usercollection/personal_info")
-    # It has no date params.
-    
-    p_info = client.get_personal_info()
-    if p_info:
-        print(f"✅ Personal Info: Fetched.")
-        # upsert expects a dict. we can use a dummy date or "latest"?
-        # Schema is (data_type, date, data).
-        # Since personal info is static/current, maybe we use today's date?
-        # Or a fixed constant date like '1970-01-01' to just store the single latest record?
-        # Let's use today's date so we have history of it changing?
-        # Actually, user probably just wants the latest.
-        # But our schema requires a date.
-        
-        # Checking schema in oura_db.py: 
-        # PRIMARY KEY (id), UNIQUE (data_type, date)
-        
-        # Let's store it with today's date.
-        upsert_oura_data("personal_info", today.isoformat(), p_info)
-    else:
-        print("⚠️ Personal Info: No data.")
 
+    # Every endpoint is requested concurrently; each response is saved as it arrives
+    jobs = oura_sync.endpoint_jobs(client, oura_sync.DAILY_ENDPOINTS, start_date, end_date)
+    jobs.append(oura_sync.heart_rate_job(client, start_date, end_date))
+    jobs += oura_sync.endpoint_jobs(client, oura_sync.DETAIL_ENDPOINTS, start_date, end_date)
+    # Sessions, tags, rest mode and VO2 max are only pulled by the backfill
+    jobs.append(oura_sync.SyncJob(
+        "Personal Info",
+        client.get_personal_info,
+        lambda p_info: save_personal_info(p_info, today.isoformat())
+    ))
+
+    results = oura_sync.run_sync(jobs, max_workers=OURA_MAX_WORKERS)
+
+    print(client.format_fetch_stats())
+    failed = [label for label, ok in results.items() if not ok]
+    if failed:
+        print(f"\n⚠️ Oura data update finished with failures: {', '.join(failed)}")
+        return False
     print("\n✅ Oura data update complete.")
+    return True
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,200 @@
+"""
+Oura Sync Engine
+Fetches several Oura endpoints concurrently over one shared OuraClient and
+writes each response page as soon as it arrives, one batched statement per
+page, while the remaining requests are still in flight
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from oura_db import upsert_oura_batch, insert_heart_rate
+
+HEART_RATE_PATH = "/usercollection/heartrate"
+
+# (label, API path, data_type) for the date-ranged collection endpoints
+DAILY_ENDPOINTS = [
+    ("Activity", "/usercollection/daily_activity", "activity"),
+    ("Sleep Daily", "/usercollection/daily_sleep", "sleep_daily"),
+    ("Readiness", "/usercollection/daily_readiness", "readiness"),
+    ("Daily Stress", "/usercollection/daily_stress", "daily_stress"),
+    ("Daily SpO2", "/usercollection/daily_spo2", "daily_spo2"),
+    ("Daily Resilience", "/usercollection/daily_resilience", "daily_resilience"),
+    ("Cardio Age", "/usercollection/daily_cardiovascular_age", "cardio_age"),
+]
+
+DETAIL_ENDPOINTS = [
+    ("Sleep Detailed", "/usercollection/sleep", "sleep_detailed"),
+    ("Sleep Time", "/usercollection/sleep_time", "sleep_time"),
+    ("Workouts", "/usercollection/workout", "workout"),
+]
+
+# Only pulled by the backfill
+EXTRA_ENDPOINTS = [
+    ("Sessions", "/usercollection/session", "session"),
+    ("Tags", "/usercollection/tag", "tag"),
+    ("Enhanced Tags", "/usercollection/enhanced_tag", "enhanced_tag"),
+    ("Rest Mode", "/usercollection/rest_mode_period", "rest_mode_period"),
+    ("VO2 Max", "/usercollection/vO2_max", "vo2_max"),
+]
+
+
+class SyncJob:
+    """
+    One fetch-then-write unit.
+
+    fetch runs on a worker thread (and may save pages itself as they arrive);
+    write runs on the calling thread with fetch's result and returns a short
+    summary line (or None).
+    """
+
+    def __init__(self, label: str, fetch: Callable[[], Any],
+                 write: Callable[[Any], Optional[str]]):
+        self.label = label
+        self.fetch = fetch
+        self.write = write
+
+
+def document_day(item: Dict[str, Any]) -> Optional[str]:
+    """Day a document belongs to: its 'day', else the date part of its timestamp."""
+    date_val = item.get('day')
+    if not date_val and 'timestamp' in item:
+        date_val = item['timestamp'].split('T')[0]
+    elif not date_val and 'start_datetime' in item:
+        date_val = item['start_datetime'].split('T')[0]
+    return date_val
+
+
+def save_documents(data_type: str, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Store documents keyed by (data_type, day) in one batched upsert.
+
+    Raises:
+        psycopg2.Error: If the write failed
+    """
+    records: List[Tuple[str, Dict]] = []
+    for item in documents:
+        date_val = document_day(item)
+        if date_val:
+            records.append((date_val, item))
+    return upsert_oura_batch(data_type, records)
+
+
+def stream_documents(client, path: str, params: Dict[str, str], data_type: str) -> Dict[str, int]:
+    """
+    Fetch a collection page by page, saving each page before requesting the next.
+
+    Returns:
+        Totals of pages, records, inserted, updated and unchanged
+
+    Raises:
+        RuntimeError: If a page request fails (earlier pages stay saved)
+        psycopg2.Error: If saving a page fails
+    """
+    totals = {'pages': 0, 'records': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+    for page in client.iter_pages(path, params):
+        counts = save_documents(data_type, page['data'])
+        totals['pages'] += 1
+        totals['records'] += len(page['data'])
+        for key in ('inserted', 'updated', 'unchanged'):
+            totals[key] += counts[key]
+    return totals
+
+
+def stream_heart_rate(client, start_datetime: str, end_datetime: str) -> Dict[str, int]:
+    """
+    Fetch heart-rate samples page by page, appending each page to oura_heart_rate.
+
+    Returns:
+        Totals of pages, records and inserted (new samples)
+
+    Raises:
+        RuntimeError: If a page request fails (earlier pages stay saved)
+        psycopg2.Error: If saving a page fails
+    """
+    params = {"start_datetime": start_datetime, "end_datetime": end_datetime}
+    totals = {'pages': 0, 'records': 0, 'inserted': 0}
+    for page in client.iter_pages(HEART_RATE_PATH, params):
+        totals['pages'] += 1
+        totals['records'] += len(page['data'])
+        totals['inserted'] += insert_heart_rate(page['data'])
+    return totals
+
+
+def heart_rate_job(client, start_date: str, end_date: str) -> SyncJob:
+    """Build a job that streams heart rate for whole days start_date..end_date."""
+    def write(totals):
+        print(f"✅ Heart Rate: Found {totals['records']} records ({totals['pages']} pages).")
+        return f"Saved: {totals['inserted']} new samples."
+
+    return SyncJob(
+        "Heart Rate",
+        # Heart rate requires datetimes
+        lambda: stream_heart_rate(client, f"{start_date}T00:00:00", f"{end_date}T23:59:59"),
+        write
+    )
+
+
+def endpoint_job(client, label: str, path: str, data_type: str,
+                 start_date: str, end_date: str) -> SyncJob:
+    """Build a job that streams one collection endpoint into data_type, page by page."""
+    params = {"start_date": start_date, "end_date": end_date}
+
+    def write(totals):
+        print(f"✅ {label}: Found {totals['records']} records ({totals['pages']} pages).")
+        return (f"Saved: {totals['inserted']} new, {totals['updated']} updated, "
+                f"{totals['unchanged']} unchanged.")
+
+    return SyncJob(label, lambda: stream_documents(client, path, params, data_type), write)
+
+
+def endpoint_jobs(client, endpoints: List[Tuple[str, str, str]],
+                  start_date: str, end_date: str) -> List[SyncJob]:
+    """Build jobs for a list of (label, path, data_type) endpoints."""
+    return [endpoint_job(client, label, path, data_type, start_date, end_date)
+            for label, path, data_type in endpoints]
+
+
+def run_sync(jobs: Iterable[SyncJob], max_workers: int) -> Dict[str, bool]:
+    """
+    Fetch jobs concurrently and write each result as it completes.
+
+    At most max_workers jobs are in flight; the next one is only started once
+    a result has been written, so memory stays bounded by max_workers
+    responses however many jobs there are (jobs may be a lazy iterator).
+
+    Args:
+        jobs: Jobs to run
+        max_workers: Maximum requests in flight
+
+    Returns:
+        Dictionary of label: True if the job fetched and wrote without raising
+    """
+    results = {}
+    jobs = iter(jobs)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="oura") as executor:
+        in_flight = {}
+
+        def submit_next():
+            job = next(jobs, None)
+            if job is not None:
+                in_flight[executor.submit(job.fetch)] = job
+
+        for _ in range(max_workers):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    summary = job.write(future.result())
+                    if summary:
+                        print(f"   [{job.label}] {summary}")
+                    results[job.label] = True
+                except Exception as e:
+                    print(f"❌ {job.label}: {e}")
+                    results[job.label] = False
+                submit_next()
+    return results
@@ -1,12 +1,14 @@
+import hashlib
+import json
 import psycopg2
-from psycopg2 import sql
 from typing import List, Dict, Any, Tuple, Optional
 from db_helpers import (
     get_db_connection,
     execute_query,
+    bulk_load,
     create_table,
     truncate_table,
-    insert_many
+    transaction
 )
 
 # --- WakaTime Operations ---
@@ -28,15 +30,14 @@ def update_wakatime_data(total_seconds: float, daily_average: float) -> bool:
     Clear and insert new WakaTime data.
     """
     try:
-        # Clear existing
-        truncate_table("wakatime", restart_identity=False)
-        
-        # Insert new
         query = """
         INSERT INTO wakatime (total_seconds, daily_average)
         VALUES (%s, %s);
         """
-        execute_query(query, (total_seconds, daily_average))
+        # Clear and insert in one transaction so readers never see an empty table
+        with transaction():
+            truncate_table("wakatime", restart_identity=False)
+            execute_query(query, (total_seconds, daily_average))
         print("WakaTime data updated successfully.")
         return True
     except Exception as e:
@@ -54,32 +55,23 @@ def create_songs_table() -> bool:
     }
     return create_table("Songs", columns)
 
-def update_songs(songs_list: List[List[str]]) -> bool:
+def update_songs(songs_list: List[List[str]], fingerprint: Optional[str] = None) -> bool:
     """
     Clear and insert new songs.
     songs_list: List of [Song_Name, Artist, SongCoverLink]
+    fingerprint: If given, stored for the "songs" dataset in the same transaction
     """
     try:
         # Ensure table exists (optional, but good practice)
         # create_songs_table() 
         
-        truncate_table("Songs", restart_identity=False)
-        
-        if not songs_list:
-            return True
-
-        # Convert list of lists to list of dicts for insert_many if we wanted to use it,
-        # but since the structure is simple, we can just loop or use a custom query.
-        # Let's use a custom query for list of lists to match previous logic style but cleaner.
-        
-        query = """
-            INSERT INTO Songs (Song_Name, Artist, SongCoverLink)
-            VALUES (%s, %s, %s)
-        """
-        
-        with get_db_connection() as (conn, cursor):
-            cursor.executemany(query, songs_list)
-            conn.commit()
+        # Truncate and reload atomically on one connection, streaming rows via COPY
+        with transaction():
+            truncate_table("Songs", restart_identity=False)
+            # bulk_load quotes identifiers; the table was created unquoted, so its names are lowercase
+            bulk_load("songs", ["song_name", "artist", "songcoverlink"], songs_list)
+            if fingerprint:
+                save_dataset_fingerprint("songs", fingerprint)
             
         print(f"{len(songs_list)} songs added successfully.")
         return True
@@ -89,25 +81,19 @@ def update_songs(songs_list: List[List[str]]) -> bool:
 
 # --- GitHub Repos Operations ---
 
-def update_repos(repos_list: List[Tuple[str, str, str]]) -> bool:
+def update_repos(repos_list: List[Tuple[str, str, str]], fingerprint: Optional[str] = None) -> bool:
     """
     Clear and insert new repos.
     repos_list: List of (reponame, description, html_url)
+    fingerprint: If given, stored for the "repos" dataset in the same transaction
     """
     try:
-        truncate_table("repos", restart_identity=False)
-        
-        if not repos_list:
-            return True
-            
-        query = """
-            INSERT INTO repos (reponame, description, html_url)
-            VALUES (%s, %s, %s)
-        """
-        
-        with get_db_connection() as (conn, cursor):
-            cursor.executemany(query, repos_list)
-            conn.commit()
+        # Truncate and reload atomically on one connection, streaming rows via COPY
+        with transaction():
+            truncate_table("repos", restart_identity=False)
+            bulk_load("repos", ["reponame", "description", "html_url"], repos_list)
+            if fingerprint:
+                save_dataset_fingerprint("repos", fingerprint)
             
         print(f"{len(repos_list)} repos added successfully.")
         return True
@@ -115,6 +101,51 @@ def update_repos(repos_list: List[Tuple[str, str, str]]) -> bool:
         print(f"Error updating repos: {e}")
         return False
 
+# --- Dataset Fingerprints (change detection) ---
+
+def create_fingerprints_table() -> bool:
+    """Create dataset_fingerprints table if not exists."""
+    columns = {
+        "dataset": "VARCHAR(50) PRIMARY KEY",
+        "fingerprint": "CHAR(64) NOT NULL",
+        "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+    }
+    return create_table("dataset_fingerprints", columns)
+
+def fingerprint_payload(payload: Any) -> str:
+    """
+    SHA-256 of a JSON-serializable payload (keys sorted, so dict order doesn't matter).
+    """
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def get_dataset_fingerprint(dataset: str) -> Optional[str]:
+    """
+    Fetch the last stored fingerprint for a dataset, or None.
+    """
+    query = "SELECT fingerprint FROM dataset_fingerprints WHERE dataset = %s;"
+    try:
+        result = execute_query(query, (dataset,), fetch_one=True)
+        return result[0] if result else None
+    except Exception as e:
+        print(f"Error fetching fingerprint for {dataset}: {e}")
+        return None
+
+def save_dataset_fingerprint(dataset: str, fingerprint: str) -> bool:
+    """
+    Insert or update the stored fingerprint for a dataset.
+    """
+    query = """
+        INSERT INTO dataset_fingerprints (dataset, fingerprint, updated_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (dataset)
+        DO UPDATE SET
+            fingerprint = EXCLUDED.fingerprint,
+            updated_at = EXCLUDED.updated_at;
+    """
+    execute_query(query, (dataset, fingerprint))
+    return True
+
 # --- Generic Helpers (Wrappers around db_helpers if needed) ---
 
 def clear_table(table_name: str) -> bool:
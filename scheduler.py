@@ -0,0 +1,271 @@
+"""
+Update Scheduler - Long-running Worker
+Keeps one Python process resident so the DB pool, HTTP sessions and
+in-memory caches stay warm between runs. Each job runs a set of orchestrator
+stages on its own interval (plus jitter). A job never overlaps itself, even
+when one of its stages timed out and is still running, and last-run times
+are stored in the scheduler_runs table so a restart picks up where the
+previous process left off. Jobs run side by side but draw on the
+orchestrator's process-wide stage slots, so together they never need more
+DB connections than the pool holds.
+
+Job and stage threads are daemon threads: on shutdown the scheduler waits up
+to SCHEDULER_SHUTDOWN_SECONDS for them, then exits and abandons the rest.
+
+Usage:
+    python scheduler.py            # run forever
+    python scheduler.py --once     # run whatever is due now, then exit
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import threading
+import time
+from typing import Dict, List, Optional
+
+from db_helpers import execute_query, print_pool_stats
+from http_client import print_latency_report
+from orchestrator import (select_stages, run_stages, print_timing_report, running_stages,
+                          wait_for_stage_threads)
+
+TABLE_NAME = "scheduler_runs"
+
+# Random delay added to every next-run time, so jobs don't fire in lockstep
+JITTER_SECONDS = float(os.getenv("SCHEDULER_JITTER_SECONDS", "60"))
+# A failed run is retried after this long (or the job interval, if shorter)
+RETRY_AFTER_FAILURE_SECONDS = float(os.getenv("SCHEDULER_RETRY_SECONDS", "900"))
+
+
+class Job:
+    """A named set of orchestrator stages run every interval_seconds."""
+
+    def __init__(self, name: str, stages: List[str], interval_seconds: float):
+        self.name = name
+        self.stages = stages
+        self.interval_seconds = interval_seconds
+        self.next_run = 0.0  # time.monotonic() deadline
+        self.running = False
+
+
+def _interval(env_name: str, default_minutes: int) -> float:
+    return float(os.getenv(env_name, str(default_minutes))) * 60
+
+
+JOBS = [
+    Job("final", ["repos", "songs"], _interval("SCHEDULE_FINAL_MINUTES", 360)),
+    Job("hourly", ["wakatime"], _interval("SCHEDULE_HOURLY_MINUTES", 60)),
+    Job("oura", ["oura"], _interval("SCHEDULE_OURA_MINUTES", 60)),
+    Job("kalshi_hourly", ["kalshi_positions", "kalshi_fills", "kalshi_profile"],
+        _interval("SCHEDULE_KALSHI_MINUTES", 60)),
+]
+
+
+def create_scheduler_runs_table() -> bool:
+    """
+    Create the scheduler_runs table.
+
+    Table Schema:
+    - job_name: Scheduler job (primary key)
+    - last_run_at: When the most recent run started
+    - last_success_at: When the most recent successful run started
+    - last_status: ok or failed
+    - last_duration_seconds: How long the most recent run took
+    """
+    query = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        job_name VARCHAR(50) PRIMARY KEY,
+        last_run_at TIMESTAMP NOT NULL,
+        last_success_at TIMESTAMP,
+        last_status VARCHAR(20) NOT NULL,
+        last_duration_seconds FLOAT
+    );
+    """
+    try:
+        execute_query(query)
+        return True
+    except Exception as e:
+        print(f"Error creating table '{TABLE_NAME}': {e}")
+        return False
+
+
+def load_last_runs() -> Dict[str, Dict]:
+    """
+    Load the last run of every job, with its age measured on the database clock.
+
+    Returns:
+        Dictionary of job_name: {age_seconds, last_status}
+    """
+    query = f"""
+        SELECT job_name, last_status,
+               EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - last_run_at)::float AS age_seconds
+        FROM {TABLE_NAME};
+    """
+    try:
+        rows = execute_query(query, fetch=True, use_dict=True)
+        return {row['job_name']: dict(row) for row in rows or []}
+    except Exception as e:
+        print(f"Error loading scheduler runs: {e}")
+        return {}
+
+
+def record_run(job_name: str, ok: bool, duration_seconds: float):
+    """Store the outcome of a run; the start time is derived from its duration."""
+    query = f"""
+        INSERT INTO {TABLE_NAME} (job_name, last_run_at, last_success_at, last_status, last_duration_seconds)
+        VALUES (%(job)s, CURRENT_TIMESTAMP - make_interval(secs => %(duration)s),
+                CASE WHEN %(ok)s THEN CURRENT_TIMESTAMP - make_interval(secs => %(duration)s) END,
+                %(status)s, %(duration)s)
+        ON CONFLICT (job_name) DO UPDATE SET
+            last_run_at = EXCLUDED.last_run_at,
+            last_success_at = COALESCE(EXCLUDED.last_success_at, {TABLE_NAME}.last_success_at),
+            last_status = EXCLUDED.last_status,
+            last_duration_seconds = EXCLUDED.last_duration_seconds;
+    """
+    params = {'job': job_name, 'ok': ok, 'status': "ok" if ok else "failed", 'duration': duration_seconds}
+    try:
+        execute_query(query, params)
+    except Exception as e:
+        print(f"Error recording run of {job_name}: {e}")
+
+
+def _delay_after(job: Job, ok: bool) -> float:
+    """Seconds until the next run after a run with the given outcome (before jitter)."""
+    return job.interval_seconds if ok else min(job.interval_seconds, RETRY_AFTER_FAILURE_SECONDS)
+
+
+def _schedule(job: Job, delay: float):
+    job.next_run = time.monotonic() + max(0.0, delay) + random.uniform(0, JITTER_SECONDS)
+
+
+class Scheduler:
+    """Runs due jobs in background threads until stopped."""
+
+    def __init__(self, jobs: List[Job]):
+        self.jobs = jobs
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def restore(self):
+        """Schedule each job relative to its last recorded run."""
+        create_scheduler_runs_table()
+        last_runs = load_last_runs()
+        for job in self.jobs:
+            last = last_runs.get(job.name)
+            if last is None:
+                job.next_run = time.monotonic()
+                print(f"[scheduler] {job.name}: no previous run, due now")
+                continue
+            remaining = _delay_after(job, last['last_status'] == "ok") - last['age_seconds']
+            _schedule(job, remaining)
+            print(f"[scheduler] {job.name}: last run {last['age_seconds'] / 60:.0f} min ago "
+                  f"({last['last_status']}), next in {max(0.0, job.next_run - time.monotonic()) / 60:.0f} min")
+
+    def _run_job(self, job: Job):
+        print(f"\n[scheduler] Starting {job.name} ({', '.join(job.stages)})")
+        started = time.perf_counter()
+        ok = False
+        lingering = []
+        try:
+            results = asyncio.run(run_stages(select_stages(job.stages)))
+            print_timing_report(results, time.perf_counter() - started)
+            ok = all(result.ok for result in results)
+            lingering = [result for result in results if result.still_running]
+        except Exception as e:
+            print(f"[scheduler] {job.name} crashed: {e}")
+        duration = time.perf_counter() - started
+
+        record_run(job.name, ok, duration)
+        if lingering:
+            # Stay "running" until timed-out stages return, so the next run can't overlap them
+            print(f"[scheduler] {job.name}: waiting for timed-out stages "
+                  f"{', '.join(result.name for result in lingering)}")
+            wait_for_stage_threads(result.future for result in lingering)
+        with self._lock:
+            _schedule(job, _delay_after(job, ok))
+            job.running = False
+        print(f"[scheduler] Finished {job.name} in {duration:.1f}s ({'ok' if ok else 'failed'}), "
+              f"next in {(job.next_run - time.monotonic()) / 60:.0f} min")
+
+    def run_due(self) -> int:
+        """Start every due job that isn't already running; returns how many started."""
+        started = 0
+        now = time.monotonic()
+        with self._lock:
+            for job in self.jobs:
+                if job.running or job.next_run > now:
+                    continue
+                job.running = True
+                thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.name}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+                started += 1
+            self._threads = [t for t in self._threads if t.is_alive()]
+        return started
+
+    def seconds_until_next(self) -> float:
+        """Sleep time for the main loop; re-check at least every minute while jobs run."""
+        with self._lock:
+            waiting = [job.next_run for job in self.jobs if not job.running]
+            any_running = any(job.running for job in self.jobs)
+        delay = min(waiting) - time.monotonic() if waiting else 60.0
+        if any_running:
+            delay = min(delay, 60.0)
+        return max(1.0, delay)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for running jobs, including their timed-out stages, to finish.
+
+        Returns:
+            True if nothing is left running
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._threads):
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        still_running = [thread.name for thread in self._threads if thread.is_alive()]
+        if still_running:
+            print(f"[scheduler] Abandoning {', '.join(still_running)} "
+                  f"(stages still running: {', '.join(running_stages()) or 'none'})")
+        return not still_running
+
+    def stop(self, *_):
+        print("\n[scheduler] Stop requested, waiting for running jobs...")
+        self._stop.set()
+
+    def run_forever(self):
+        """Loop until SIGTERM/SIGINT, sleeping until the next job is due."""
+        while not self._stop.is_set():
+            self.run_due()
+            self._stop.wait(self.seconds_until_next())
+        self.join(timeout=float(os.getenv("SCHEDULER_SHUTDOWN_SECONDS", "25")))
+        print_pool_stats()
+        print_latency_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run portfolio update jobs on a schedule.")
+    parser.add_argument("--once", action="store_true", help="Run the jobs that are due now, then exit")
+    args = parser.parse_args()
+
+    scheduler = Scheduler(JOBS)
+    scheduler.restore()
+
+    if args.once:
+        scheduler.run_due()
+        scheduler.join()
+        print_pool_stats()
+        print_latency_report()
+        return
+
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
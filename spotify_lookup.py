@@ -0,0 +1,169 @@
+"""
+Spotify Lookup
+Resolves cover art for a whole chart: one encoded search per distinct song,
+album images shared between tracks on the same album, and any albums
+missing images fetched in bulk through /v1/albums?ids=
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import http_client
+
+API_BASE_URL = "https://api.spotify.com/v1"
+ALBUMS_BATCH_SIZE = 20  # Spotify's limit for /v1/albums?ids=
+
+# (connect, read) timeout for Spotify requests, in seconds
+TIMEOUT = (3.05, 10)
+
+SPOTIFY_MAX_CONCURRENCY = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", "5"))
+_spotify_limit = threading.BoundedSemaphore(SPOTIFY_MAX_CONCURRENCY)
+
+
+class _Bearer:
+    """Holds the current token so a refresh after a 401 is shared by later requests."""
+
+    def __init__(self, token: str, refresh: Optional[Callable[[str], Optional[str]]]):
+        self.token = token
+        self.refresh = refresh
+        self.lock = threading.Lock()
+
+    def renew(self, rejected: str) -> Optional[str]:
+        with self.lock:
+            if self.token == rejected and self.refresh:
+                self.token = self.refresh(rejected)
+            return self.token
+
+
+def _get(path: str, params: Dict, bearer: _Bearer) -> Optional[Dict]:
+    """GET an API path, refreshing the token and retrying once on a 401; None if it failed."""
+    token = bearer.token
+    for attempt in range(2):
+        response = http_client.get(f"{API_BASE_URL}{path}", params=params, limit=_spotify_limit,
+                                   headers={'Authorization': f'Bearer {token}'}, timeout=TIMEOUT)
+        if response.status_code == 401 and attempt == 0:
+            token = bearer.renew(token)
+            if not token:
+                return None
+            continue
+        if response.status_code == 200:
+            return response.json()
+        print(f"Spotify request {path} failed: {response.status_code}, {response.text}")
+        return None
+    return None
+
+
+def pick_image(images: List[Dict]) -> Optional[str]:
+    """Prefer the second (medium-sized) image, falling back to the first."""
+    if len(images) > 1:
+        return images[1]['url']
+    if images:
+        return images[0]['url']
+    return None
+
+
+def search_track(song: List[str], bearer: _Bearer) -> Tuple[bool, Optional[Dict]]:
+    """
+    Search for the best matching track.
+
+    Args:
+        song: List containing [song_name, artist_name]
+        bearer: Current Spotify token holder
+
+    Returns:
+        Tuple of (ok, track): ok is False if the request failed; a successful
+        search with no results gives (True, None)
+    """
+    params = {'q': f"track:{song[0]} artist:{song[1]}", 'type': 'track', 'limit': 1}
+    try:
+        data = _get("/search", params, bearer)
+    except Exception as e:
+        print(f"Error searching Spotify: {e}")
+        return False, None
+    if data is None:
+        return False, None
+
+    items = data.get('tracks', {}).get('items') or []
+    if not items:
+        print(f"No Spotify results found for: {song[0]} by {song[1]}")
+        return True, None
+    return True, items[0]
+
+
+def get_album_images(album_ids: List[str], bearer: _Bearer) -> Dict[str, Optional[str]]:
+    """
+    Fetch album images in batches of 20 via /v1/albums?ids=.
+
+    Returns:
+        Dictionary of album_id: image URL (or None); albums in a failed batch are left out
+    """
+    images = {}
+    for i in range(0, len(album_ids), ALBUMS_BATCH_SIZE):
+        batch = album_ids[i:i + ALBUMS_BATCH_SIZE]
+        try:
+            data = _get("/albums", {'ids': ",".join(batch)}, bearer)
+        except Exception as e:
+            print(f"Error fetching Spotify albums: {e}")
+            data = None
+        for album in (data or {}).get('albums') or []:
+            if album:
+                images[album['id']] = pick_image(album.get('images') or [])
+    return images
+
+
+def resolve_chart(songs: List[List[str]], bearer: Optional[str],
+                  refresh_bearer: Optional[Callable[[str], Optional[str]]] = None,
+                  max_workers: Optional[int] = None) -> List[Tuple[Optional[str], bool]]:
+    """
+    Resolve Spotify cover URLs for a list of songs.
+
+    Args:
+        songs: List of [song_name, artist_name]
+        bearer: Spotify access token
+        refresh_bearer: Called with a rejected token, returns a new one (used on 401)
+        max_workers: Maximum concurrent searches (default: SPOTIFY_MAX_CONCURRENCY)
+
+    Returns:
+        (cover_url, confirmed) per song, in the same order as songs. confirmed
+        is True when Spotify answered, so a None URL is a real "no cover"
+        rather than a failed request.
+    """
+    if not songs or not bearer:
+        return [(None, False)] * len(songs)
+
+    holder = _Bearer(bearer, refresh_bearer)
+
+    # One search per distinct (song, artist)
+    unique = list(dict.fromkeys((song[0], song[1]) for song in songs))
+    workers = max_workers or min(len(unique), SPOTIFY_MAX_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        searches = dict(zip(unique, executor.map(lambda key: search_track(list(key), holder), unique)))
+
+    # Search results embed the album; tracks from the same album share its image
+    album_images = {}
+    for _, track in searches.values():
+        album = (track or {}).get('album') or {}
+        if album.get('id') and album_images.get(album['id']) is None:
+            album_images[album['id']] = pick_image(album.get('images') or [])
+
+    missing = [album_id for album_id, image in album_images.items() if image is None]
+    failed_albums = set()
+    if missing:
+        fetched = get_album_images(missing, holder)
+        album_images.update(fetched)
+        failed_albums = set(missing) - set(fetched)
+
+    covers = []
+    for song in songs:
+        ok, track = searches[(song[0], song[1])]
+        album_id = ((track or {}).get('album') or {}).get('id')
+        if not ok:
+            covers.append((None, False))
+        elif not album_id:
+            covers.append((None, True))
+        else:
+            image = album_images.get(album_id)
+            covers.append((image, image is not None or album_id not in failed_albums))
+    return covers
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """Test script to check trades endpoint and calculate accurate P&L"""
 
-from kalshi import get_user_trades, calculate_pnl_from_trades
+from kalshi import iter_fills, compute_pnl_by_ticker
 
-# Test fetching trades
+# Test fetching trades (all pages)
 print("Fetching user trades...")
-trades_data = get_user_trades(limit=200)
+try:
+    fills = list(iter_fills())
+except RuntimeError as e:
+    print(f"Error: {e}")
+    fills = None
 
-if trades_data and 'fills' in trades_data:
-    fills = trades_data['fills']
+if fills is not None:
     print(f"\n✓ Found {len(fills)} trades")
     
     # Group trades by ticker
@@ -35,6 +38,9 @@ if trades_data and 'fills' in trades_data:
         'KXGOVSHUTLENGTH-26JAN01-45D'
     ]
     
+    # P&L for every ticker from one pass over the fills already fetched (oldest first)
+    pnl_by_ticker = compute_pnl_by_ticker(sorted(fills, key=lambda f: f.get('created_time') or ''))
+    
     print("="*80)
     print("TRADES FOR KEY POSITIONS:")
     print("="*80)
@@ -60,13 +66,14 @@ if trades_data and 'fills' in trades_data:
                 print(f"  ... and {len(ticker_fills) - 5} more trades")
             
             # Calculate P&L
-            print(f"\n  Calculating P&L from trades...")
-            pnl_data = calculate_pnl_from_trades(ticker)
+            print(f"\n  P&L from trades:")
+            pnl_data = pnl_by_ticker[ticker]
             print(f"  Total Cost: ${pnl_data['total_cost']/100:.2f}")
             print(f"  Total Sales: ${pnl_data['total_sales']/100:.2f}")
             print(f"  Net Position: {pnl_data['net_position']} contracts")
             print(f"  Realized P&L: ${pnl_data['realized_pnl']/100:.2f}")
             print(f"  Avg Cost: {pnl_data['avg_cost']:.2f}¢/contract")
+            print(f"  Cost Basis: ${pnl_data['cost_basis']/100:.2f}")
         else:
             print(f"\n{ticker}: No trades found")
     
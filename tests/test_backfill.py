@@ -0,0 +1,105 @@
+"""Tests for the backfill partitioning and checkpointing (no database access)."""
+
+from datetime import date
+
+import pytest
+
+import backfill_oura
+import oura_sync
+
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def iter_pages(self, path, params):
+        self.requests.append((path, dict(params)))
+        yield from self.pages
+
+
+@pytest.fixture
+def marks(monkeypatch):
+    calls = []
+    monkeypatch.setattr(backfill_oura.oura_db, "mark_chunk",
+                        lambda *args, **kwargs: calls.append((args, kwargs)))
+    return calls
+
+
+def run_job(job):
+    return oura_sync.run_sync([job], max_workers=1)[job.label]
+
+
+def test_partition_marked_done_after_pages_are_saved(monkeypatch, marks):
+    monkeypatch.setattr(oura_sync, "save_documents",
+                        lambda data_type, documents: {'inserted': len(documents), 'updated': 0, 'unchanged': 0})
+    client = FakeClient([{'data': [{'day': '2024-01-01'}]}, {'data': [{'day': '2024-01-02'}]}])
+
+    assert run_job(backfill_oura.partition_job(client, "activity", "2024-01-01", "2024-01-30"))
+    assert client.requests == [("/usercollection/daily_activity",
+                                {"start_date": "2024-01-01", "end_date": "2024-01-30"})]
+    assert marks == [(("activity", "2024-01-01", "2024-01-30", "done"), {'records': 2})]
+
+
+def test_failed_write_marks_partition_failed(monkeypatch, marks):
+    def fail(data_type, documents):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(oura_sync, "save_documents", fail)
+    client = FakeClient([{'data': [{'day': '2024-01-01'}]}])
+
+    assert not run_job(backfill_oura.partition_job(client, "activity", "2024-01-01", "2024-01-30"))
+    assert marks == [(("activity", "2024-01-01", "2024-01-30", "failed"), {'error': "connection lost"})]
+
+
+def test_failed_heart_rate_write_marks_partition_failed(monkeypatch, marks):
+    def fail(points):
+        raise RuntimeError("copy failed")
+
+    monkeypatch.setattr(oura_sync, "insert_heart_rate", fail)
+    client = FakeClient([{'data': [{'bpm': 60, 'source': 'awake', 'timestamp': '2024-01-01T00:00:00+00:00'}]}])
+
+    assert not run_job(backfill_oura.partition_job(client, "heart_rate", "2024-01-01", "2024-01-25"))
+    assert client.requests[0][1] == {"start_datetime": "2024-01-01T00:00:00",
+                                     "end_datetime": "2024-01-25T23:59:59"}
+    assert marks[0][0][3] == "failed"
+
+
+def test_unsettled_partition_is_left_partial(monkeypatch, marks):
+    monkeypatch.setattr(oura_sync, "save_documents",
+                        lambda data_type, documents: {'inserted': len(documents), 'updated': 0, 'unchanged': 0})
+    monkeypatch.setattr(backfill_oura, "settled_through", lambda: date(2024, 1, 28))
+    client = FakeClient([{'data': [{'day': '2024-01-29'}]}])
+
+    assert run_job(backfill_oura.partition_job(client, "activity", "2024-01-01", "2024-01-30"))
+    assert run_job(backfill_oura.partition_job(client, "activity", "2023-12-01", "2023-12-30"))
+    assert [call[0][3] for call in marks] == ["partial", "done"]
+
+
+def test_settled_through_lags_today():
+    assert backfill_oura.settled_through(date(2024, 3, 1)) == date(2024, 2, 28)
+
+
+def test_iter_chunks_follows_fixed_grid_and_clips_ends():
+    chunks = list(backfill_oura.iter_chunks(date(2024, 1, 1), date(2024, 3, 1), 25))
+
+    assert chunks == [
+        (date(2024, 1, 1), date(2024, 1, 9)),
+        (date(2024, 1, 10), date(2024, 2, 3)),
+        (date(2024, 2, 4), date(2024, 2, 28)),
+        (date(2024, 2, 29), date(2024, 3, 1)),
+    ]
+    assert all((chunk_start - backfill_oura.PARTITION_EPOCH).days % 25 == 0 for chunk_start, _ in chunks[1:])
+
+
+def test_shifted_range_reuses_inner_partitions():
+    yesterday = list(backfill_oura.iter_chunks(date(2024, 1, 1), date(2024, 4, 1), 30))
+    today = list(backfill_oura.iter_chunks(date(2024, 1, 2), date(2024, 4, 2), 30))
+
+    assert yesterday[1:-1] == today[1:-1]
+    assert today[0][1] == yesterday[0][1] and today[-1][0] == yesterday[-1][0]
+
+
+def test_iter_chunks_single_day():
+    assert list(backfill_oura.iter_chunks(date(2024, 1, 1), date(2024, 1, 1), 30)) == \
+        [(date(2024, 1, 1), date(2024, 1, 1))]
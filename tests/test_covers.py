@@ -0,0 +1,41 @@
+"""Tests for cover resolution and negative caching in api_helpers (providers and cache faked)."""
+
+import pytest
+
+import api_helpers
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    entries = []
+    monkeypatch.setattr(api_helpers.cover_cache, "lookup_many", lambda songs: {})
+    monkeypatch.setattr(api_helpers.cover_cache, "store_many", entries.extend)
+    monkeypatch.setattr(api_helpers.cover_cache, "format_stats", lambda: "")
+    return entries
+
+
+def fake_providers(monkeypatch, spotify, google):
+    monkeypatch.setattr(api_helpers.spotify_lookup, "resolve_chart",
+                        lambda songs, bearer, **kwargs: [spotify[song[0]] for song in songs])
+    monkeypatch.setattr(api_helpers, "_search_serpapi", lambda song: google[song[0]])
+
+
+def test_only_found_covers_and_confirmed_misses_are_cached(monkeypatch, stored):
+    fake_providers(monkeypatch,
+                   spotify={"a": ("spotify-a", True), "b": (None, True), "c": (None, True), "d": (None, False)},
+                   google={"b": ("google-b", True), "c": (None, True), "d": (None, True)})
+
+    covers = api_helpers.resolve_covers([["a", "x"], ["b", "x"], ["c", "x"], ["d", "x"]], "token")
+
+    assert covers == ["spotify-a", "google-b", None, None]
+    # "d" is a miss only because Spotify failed, so it is retried next run
+    assert [(song[0], image, source) for song, image, source in stored] == [
+        ("a", "spotify-a", "spotify"), ("b", "google-b", "google"), ("c", None, None)
+    ]
+
+
+def test_get_cover_image_goes_through_resolve_covers(monkeypatch, stored):
+    fake_providers(monkeypatch, spotify={"a": (None, False)}, google={"a": ("google-a", True)})
+
+    assert api_helpers.get_cover_image(["a", "x"], None) == "google-a"
+    assert [source for _, _, source in stored] == ["google"]
@@ -0,0 +1,155 @@
+"""Tests for db_helpers' COPY loading, transaction() and pool (no database access)."""
+
+import pytest
+from psycopg2 import sql
+from psycopg2.pool import PoolError
+
+import db_helpers
+
+
+def render(statement):
+    """Render a psycopg2 sql composable the way Postgres would see it (no connection needed)."""
+    if isinstance(statement, str):
+        return statement
+    if isinstance(statement, sql.Composed):
+        return "".join(render(part) for part in statement.seq)
+    if isinstance(statement, sql.Identifier):
+        return ".".join('"' + name.replace('"', '""') + '"' for name in statement.strings)
+    if isinstance(statement, sql.SQL):
+        return statement.string
+    raise TypeError(statement)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        if self.connection.fail_on and self.connection.fail_on in render(query):
+            raise db_helpers.psycopg2.ProgrammingError("boom")
+        self.connection.statements.append(render(query))
+        self.rowcount = 2
+
+    def copy_expert(self, query, buffer):
+        self.connection.statements.append(render(query))
+        self.connection.copied.append(buffer.read())
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.statements = []
+        self.copied = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def get_transaction_status(self):
+        return db_helpers.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    """Install a pool whose only connection is a FakeConnection."""
+    fake = FakeConnection()
+    pool = db_helpers.ConnectionPool(minconn=0, maxconn=1, wait_timeout=0.01)
+    monkeypatch.setattr(pool, "_connect", lambda: fake)
+    monkeypatch.setattr(db_helpers, "_pool", pool)
+    return fake
+
+
+def test_copy_field_quotes_everything_but_null():
+    assert db_helpers._copy_field(None) == ''
+    assert db_helpers._copy_field('') == '""'
+    assert db_helpers._copy_field('say "hi", ok') == '"say ""hi"", ok"'
+    assert db_helpers._copy_field(True) == '"true"'
+    assert db_helpers._copy_field(3) == '"3"'
+    assert db_helpers._copy_field({"a": [1]}) == '"{""a"": [1]}"'
+
+
+def test_bulk_load_copies_straight_into_table(connection):
+    db_helpers.bulk_load("songs", ["song_name", "artist", "songcoverlink"],
+                         [("A", "B", "http://x"), ("C", "D", None)])
+
+    assert connection.statements == [
+        'COPY "songs" ("song_name", "artist", "songcoverlink") FROM STDIN WITH (FORMAT csv)'
+    ]
+    assert connection.copied == ['"A","B","http://x"\n"C","D",\n']
+    assert connection.commits == 1
+
+
+def test_bulk_load_merges_through_staging_table(connection):
+    rows = [("k1", 1), ("k2", 2), ("k1", 3)]
+    db_helpers.bulk_load("cache", ["key", "value"], rows, conflict_columns=["key"],
+                         update_columns=["value"], extra_updates={"updated_at": "CURRENT_TIMESTAMP"})
+
+    assert connection.statements == [
+        'DROP TABLE IF EXISTS "_bulk_stage_cache";',
+        'CREATE TEMP TABLE "_bulk_stage_cache" ON COMMIT DROP AS SELECT "key", "value" FROM "cache" WITH NO DATA;',
+        'COPY "_bulk_stage_cache" ("key", "value") FROM STDIN WITH (FORMAT csv)',
+        'INSERT INTO "cache" ("key", "value") SELECT "key", "value" FROM "_bulk_stage_cache" '
+        'ON CONFLICT ("key") DO UPDATE SET "value" = EXCLUDED."value", "updated_at" = CURRENT_TIMESTAMP;',
+        'DROP TABLE "_bulk_stage_cache";',
+    ]
+    # Duplicate keys are collapsed before COPY, last row wins
+    assert connection.copied == ['"k1","3"\n"k2","2"\n']
+
+
+def test_bulk_load_without_update_columns_does_nothing_on_conflict(connection):
+    db_helpers.bulk_load("t", ["id"], [(1,)], conflict_columns=["id"])
+
+    assert connection.statements[3].endswith('ON CONFLICT ("id") DO NOTHING;')
+
+
+def test_transaction_shares_one_connection_and_commits_once(connection):
+    with db_helpers.transaction():
+        db_helpers.execute_query("TRUNCATE TABLE songs;")
+        db_helpers.bulk_load("songs", ["song_name"], [("A",)])
+
+    assert connection.statements == ['TRUNCATE TABLE songs;', 'COPY "songs" ("song_name") FROM STDIN WITH (FORMAT csv)']
+    assert connection.commits == 1
+    assert db_helpers.get_pool().stats()['in_use'] == 0
+
+
+def test_transaction_rolls_back_when_a_statement_fails(connection):
+    connection.fail_on = "INSERT"
+
+    with pytest.raises(db_helpers.psycopg2.DatabaseError):
+        with db_helpers.transaction():
+            db_helpers.execute_query("TRUNCATE TABLE songs;")
+            try:
+                db_helpers.execute_query("INSERT INTO songs VALUES (1);")
+            except Exception:
+                pass  # Swallowed by the caller, but the transaction still fails
+
+    assert connection.commits == 0
+    assert connection.rollbacks == 1
+
+
+def test_pool_reuses_connections_and_times_out_when_exhausted(connection):
+    pool = db_helpers.get_pool()
+    first = pool.getconn()
+    with pytest.raises(PoolError):
+        pool.getconn()
+    pool.putconn(first)
+
+    assert pool.getconn() is first
+    stats = pool.stats()
+    assert (stats['checkouts'], stats['waits'], stats['idle'], stats['in_use']) == (3, 1, 0, 1)
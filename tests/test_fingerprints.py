@@ -0,0 +1,21 @@
+"""Tests for portfolio_operations.fingerprint_payload."""
+
+from portfolio_operations import fingerprint_payload
+
+
+def test_dict_key_order_does_not_change_fingerprint():
+    assert fingerprint_payload({"a": 1, "b": [1, 2]}) == fingerprint_payload({"b": [1, 2], "a": 1})
+
+
+def test_any_value_or_order_change_changes_fingerprint():
+    base = fingerprint_payload([["Song", "Artist"], ["Other", "Band"]])
+
+    assert fingerprint_payload([["Other", "Band"], ["Song", "Artist"]]) != base
+    assert fingerprint_payload([["Song", "Artist"], ["Other", "Band "]]) != base
+
+
+def test_fingerprint_is_a_stable_sha256_hex_digest():
+    digest = fingerprint_payload([])
+
+    assert digest == "4f53cda18c2baa0c0354bb5f9a3ecbe5ed12ab4d8e11ba873c2f11161202b945"
+    assert len(fingerprint_payload({"non_json": object}).encode()) == 64
@@ -0,0 +1,78 @@
+"""Tests for http_client.request retry behaviour (no network access)."""
+
+import threading
+
+import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses, limit=None):
+        self.responses = list(responses)
+        self.limit = limit
+        self.held = []
+
+    def request(self, method, url, **kwargs):
+        if self.limit is not None:
+            # A BoundedSemaphore(1) that is held can't be acquired again
+            self.held.append(not self.limit.acquire(blocking=False))
+            if not self.held[-1]:
+                self.limit.release()
+        return self.responses.pop(0)
+
+
+def test_retry_after_is_honoured_in_full(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    session = FakeSession([FakeResponse(429, {"Retry-After": "45"}), FakeResponse(200)])
+
+    response = http_client.request("GET", "https://example.test/x", session=session, deadline=120)
+
+    assert response.status_code == 200
+    assert sleeps == [45.0]
+
+
+def test_retry_after_past_the_deadline_gives_up(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    session = FakeSession([FakeResponse(503, {"Retry-After": "90"}), FakeResponse(200)])
+
+    response = http_client.request("GET", "https://example.test/x", session=session, deadline=60)
+
+    assert response.status_code == 503
+    assert sleeps == []
+
+
+def test_limit_is_held_per_attempt_and_released_while_sleeping(monkeypatch):
+    limit = threading.BoundedSemaphore(1)
+    free_while_sleeping = []
+
+    def sleep(_):
+        acquired = limit.acquire(blocking=False)
+        free_while_sleeping.append(acquired)
+        if acquired:
+            limit.release()
+
+    monkeypatch.setattr(http_client.time, "sleep", sleep)
+    session = FakeSession([FakeResponse(500), FakeResponse(200)], limit=limit)
+
+    response = http_client.request("GET", "https://example.test/x", session=session, limit=limit)
+
+    assert response.status_code == 200
+    assert session.held == [True, True]
+    assert free_while_sleeping == [True]
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda _: None)
+    session = FakeSession([FakeResponse(404), FakeResponse(200)])
+
+    assert http_client.request("GET", "https://example.test/x", session=session).status_code == 404
@@ -0,0 +1,126 @@
+"""Tests for the pure P&L helpers in kalshi.py (no API or database access)."""
+
+import random
+
+import pytest
+
+import kalshi
+from kalshi import aggregate_fills, compute_pnl_by_ticker, fill_fee_cents
+
+
+def fill(ticker, action, side, count, yes_price, **extra):
+    return dict(ticker=ticker, action=action, side=side, count=count,
+                yes_price=yes_price, no_price=100 - yes_price, **extra)
+
+
+def test_round_trip_realizes_average_cost_pnl():
+    fills = [
+        fill("A", "buy", "yes", 10, 40),
+        fill("A", "buy", "yes", 10, 60),   # avg 50
+        fill("A", "sell", "yes", 20, 70),
+    ]
+    result = compute_pnl_by_ticker(fills)["A"]
+
+    assert result["net_position"] == 0
+    assert result["realized_pnl"] == pytest.approx(20 * (70 - 50))
+    assert result["avg_cost"] == 0
+    assert result["cost_basis"] == 0
+    assert result["total_cost"] == 1000
+    assert result["total_sales"] == 1400
+    assert result["fill_count"] == 3
+
+
+def test_partial_close_keeps_entry_price_and_marks_to_market():
+    fills = [
+        fill("A", "buy", "yes", 10, 30),
+        fill("A", "sell", "yes", 4, 50),
+    ]
+    result = compute_pnl_by_ticker(fills, current_prices={"A": 45})["A"]
+
+    assert result["net_position"] == 6
+    assert result["avg_cost"] == pytest.approx(30)
+    assert result["cost_basis"] == pytest.approx(180)
+    assert result["realized_pnl"] == pytest.approx(4 * 20)
+    assert result["unrealized_pnl"] == pytest.approx(6 * 15)
+
+
+def test_buying_no_is_a_short_yes_position():
+    result = compute_pnl_by_ticker([fill("A", "buy", "no", 5, 30)])["A"]
+
+    assert result["net_position"] == -5
+    # Entry price is expressed on the side actually held (NO at 70)
+    assert result["avg_cost"] == pytest.approx(70)
+    assert result["total_cost"] == 5 * 70
+
+
+def test_flip_resets_entry_price_to_flip_price():
+    fills = [
+        fill("A", "buy", "yes", 5, 40),
+        fill("A", "sell", "yes", 8, 60),   # closes 5, opens 3 short YES
+    ]
+    result = compute_pnl_by_ticker(fills)["A"]
+
+    assert result["net_position"] == -3
+    assert result["realized_pnl"] == pytest.approx(5 * 20)
+    assert result["avg_cost"] == pytest.approx(40)  # NO side of a 60 YES price
+
+
+def test_tickers_are_kept_apart_and_fees_summed():
+    fills = [
+        fill("A", "buy", "yes", 1, 50, fee=2),
+        fill("B", "buy", "yes", 1, 50, fee_cost="0.0700"),
+        fill("A", "settle", "yes", 1, 50),   # ignored: not a buy or sell
+    ]
+    result = compute_pnl_by_ticker(fills)
+
+    assert set(result) == {"A", "B"}
+    assert result["A"]["total_fees"] == 2
+    assert result["B"]["total_fees"] == 7
+    assert result["A"]["fill_count"] == 1
+    assert result["A"]["unrealized_pnl"] is None
+
+
+def test_aggregate_fills_reports_net_cash_flow_not_realized_pnl():
+    result = aggregate_fills(iter([
+        fill("A", "buy", "yes", 10, 40, fee=1),
+        fill("A", "sell", "yes", 4, 70, fee=1),
+    ]))
+
+    assert "realized_pnl" not in result
+    assert result["net_cash_flow"] == 4 * 70 - 10 * 40
+    assert result["net_position"] == 6
+    assert result["total_fees"] == 2
+
+
+def test_fill_fee_cents_reads_cents_or_dollar_string():
+    assert fill_fee_cents({"fee": 3}) == 3
+    assert fill_fee_cents({"fee_cost": "0.0700"}) == 7
+    assert fill_fee_cents({}) == 0
+
+
+def test_all_tickers_from_newest_first_stream_matches_chronological_engine(monkeypatch):
+    rng = random.Random(7)
+    history = []
+    for _ in range(400):
+        price = rng.randint(1, 99)
+        history.append(fill(rng.choice("ABC"), rng.choice(["buy", "sell"]), rng.choice(["yes", "no"]),
+                            rng.randint(1, 10), price, fee=1))
+    calls = []
+
+    def iter_fills(**kwargs):
+        calls.append(kwargs)
+        # The API streams newest first
+        return (f for f in reversed(history))
+
+    monkeypatch.setattr(kalshi, "iter_fills", iter_fills)
+    prices = {"A": 50, "B": 10}
+
+    result = kalshi.calculate_pnl_for_all_tickers(prices, min_ts=100)
+    expected = compute_pnl_by_ticker(history, prices)
+
+    assert result.keys() == expected.keys()
+    for ticker, breakdown in expected.items():
+        for key, value in breakdown.items():
+            assert result[ticker][key] == (None if value is None else pytest.approx(value)), (ticker, key)
+    # Both passes read the same pinned window
+    assert len(calls) == 2 and calls[0] == calls[1] and calls[0]["max_ts"] is not None
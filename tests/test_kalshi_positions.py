@@ -0,0 +1,66 @@
+"""Tests for the kalshi_positions diff sync (database calls are faked)."""
+
+import contextlib
+
+import pytest
+
+import kalshi_tracker
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fake the DB helpers used by sync_positions and record the writes."""
+    state = {'rows': [], 'inserted': [], 'updated': [], 'deleted': []}
+
+    def execute_query(query, params=None, fetch=False, use_dict=False, **kwargs):
+        if query.startswith("SELECT"):
+            return [dict(row) for row in state['rows']]
+        if query.startswith("DELETE"):
+            state['deleted'].extend(params[0])
+
+    def bulk_load(table, columns, rows, **kwargs):
+        state['inserted'].extend(dict(zip(columns, row)) for row in rows)
+        return len(rows)
+
+    def execute_many(query, params_list):
+        state['updated'].extend(params[-1] for params in params_list)
+        return len(params_list)
+
+    monkeypatch.setattr(kalshi_tracker, "execute_query", execute_query)
+    monkeypatch.setattr(kalshi_tracker, "bulk_load", bulk_load)
+    monkeypatch.setattr(kalshi_tracker, "execute_many", execute_many)
+    monkeypatch.setattr(kalshi_tracker, "transaction", contextlib.nullcontext)
+    return state
+
+
+def position(market_id, position=1, pnl=0.0):
+    return {'market_id': market_id, 'position': position, 'pnl': pnl}
+
+
+def test_sync_positions_writes_only_the_delta(db):
+    db['rows'] = [
+        dict(position("kept", 5, 100), last_updated="earlier"),
+        dict(position("changed", 2, 10), last_updated="earlier"),
+        dict(position("closed", 1, 0), last_updated="earlier"),
+    ]
+
+    counts = kalshi_tracker.sync_positions([
+        position("kept", 5, 100.0),  # Float from the API equals the stored integer
+        position("changed", 3, 10),
+        position("new", 1, 0),
+    ])
+
+    assert counts == {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1}
+    assert [row['market_id'] for row in db['inserted']] == ["new"]
+    assert db['updated'] == ["changed"]
+    assert db['deleted'] == ["closed"]
+
+
+def test_sync_positions_with_no_positions_deletes_every_row(db):
+    db['rows'] = [position("a"), position("b")]
+
+    counts = kalshi_tracker.sync_positions([])
+
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 0}
+    assert db['deleted'] == ["a", "b"]
+    assert db['inserted'] == db['updated'] == []
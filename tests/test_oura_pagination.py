@@ -0,0 +1,58 @@
+"""Tests for OuraClient next_token pagination (no network or token store access)."""
+
+import threading
+
+import pytest
+
+from oura_fetcher import OuraClient
+
+
+def make_client(pages):
+    """An OuraClient whose _get serves the given pages in order and records the params."""
+    client = OuraClient.__new__(OuraClient)
+    client._stats = {'requests': 0, 'pages_fetched': 0, 'bytes_fetched': 0}
+    client._stats_lock = threading.Lock()
+    client.calls = []
+    pages = list(pages)
+
+    def fake_get(endpoint, params=None):
+        client.calls.append((endpoint, dict(params or {})))
+        return pages.pop(0)
+
+    client._get = fake_get
+    return client
+
+
+def test_iter_pages_follows_next_token():
+    client = make_client([
+        {'data': [1, 2], 'next_token': "a"},
+        {'data': [3], 'next_token': "b"},
+        {'data': [], 'next_token': None},
+    ])
+
+    pages = list(client.iter_pages("/usercollection/heartrate", {"start_datetime": "x"}))
+
+    assert [page['data'] for page in pages] == [[1, 2], [3], []]
+    assert [params for _, params in client.calls] == [
+        {"start_datetime": "x"},
+        {"start_datetime": "x", "next_token": "a"},
+        {"start_datetime": "x", "next_token": "b"},
+    ]
+    assert client.get_fetch_stats()['pages_fetched'] == 3
+
+
+def test_iter_pages_raises_on_failed_page_after_yielding_earlier_ones():
+    client = make_client([{'data': [1], 'next_token': "a"}, {}])
+    pages = client.iter_pages("/usercollection/daily_sleep")
+
+    assert next(pages)['data'] == [1]
+    with pytest.raises(RuntimeError, match="page 2 failed"):
+        next(pages)
+
+
+def test_get_all_merges_pages_and_returns_empty_on_failure():
+    client = make_client([{'data': [1], 'next_token': "a"}, {'data': [2]}])
+    assert client._get_all("/usercollection/workout") == {'data': [1, 2], 'next_token': None}
+
+    failing = make_client([{'data': [1], 'next_token': "a"}, {}])
+    assert failing._get_all("/usercollection/workout") == {}
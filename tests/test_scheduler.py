@@ -0,0 +1,81 @@
+"""Tests for scheduler due-time logic and the shared stage limit (no database access)."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import orchestrator
+import scheduler
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(scheduler, "JITTER_SECONDS", 0)
+    monkeypatch.setattr(scheduler, "RETRY_AFTER_FAILURE_SECONDS", 900)
+    monkeypatch.setattr(scheduler, "create_scheduler_runs_table", lambda: True)
+
+
+def minutes_until(job):
+    return (job.next_run - time.monotonic()) / 60
+
+
+def test_restore_schedules_from_persisted_last_runs(monkeypatch):
+    jobs = [scheduler.Job(name, ["wakatime"], 3600) for name in ("new", "ok", "failed", "overdue")]
+    monkeypatch.setattr(scheduler, "load_last_runs", lambda: {
+        "ok": {'age_seconds': 20 * 60, 'last_status': "ok"},
+        "failed": {'age_seconds': 5 * 60, 'last_status': "failed"},
+        "overdue": {'age_seconds': 3 * 3600, 'last_status': "ok"},
+    })
+
+    scheduler.Scheduler(jobs).restore()
+    new, ok, failed, overdue = jobs
+
+    assert minutes_until(new) <= 0
+    assert minutes_until(ok) == pytest.approx(40, abs=0.1)
+    # A failed run is retried after RETRY_AFTER_FAILURE_SECONDS, not the full interval
+    assert minutes_until(failed) == pytest.approx(10, abs=0.1)
+    assert minutes_until(overdue) <= 0
+
+
+def test_run_due_skips_running_and_future_jobs(monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler.Scheduler, "_run_job", lambda self, job: started.append(job.name))
+    due, running, later = (scheduler.Job(name, [], 3600) for name in ("due", "running", "later"))
+    running.running = True
+    later.next_run = time.monotonic() + 600
+
+    sched = scheduler.Scheduler([due, running, later])
+    assert sched.run_due() == 1
+    sched.join()
+
+    assert started == ["due"]
+    assert due.running  # Cleared by _run_job once the run (and any timed-out stage) finishes
+
+
+def test_concurrent_jobs_share_the_stage_limit(monkeypatch):
+    monkeypatch.setattr(orchestrator, "_stage_slots", threading.BoundedSemaphore(2))
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def stage():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+
+    def job():
+        stages = [orchestrator.Stage(f"s{i}", stage) for i in range(3)]
+        results.extend(asyncio.run(orchestrator.run_stages(stages)))
+
+    results = []
+    threads = [threading.Thread(target=job) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 9 and all(result.ok for result in results)
+    assert peak[0] == 2
@@ -0,0 +1,70 @@
+"""Tests for ttl_cache.TTLCache."""
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=10)
+    cache.set("a", 1)
+
+    assert cache.get("a") == (True, 1)
+    clock.now += 10
+    assert cache.get("a") == (False, None)
+    assert "a" not in cache
+    assert cache.stats()["expirations"] == 1
+
+
+def test_none_is_cached_with_negative_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=100)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return None
+
+    assert cache.get_or_load("x", loader, negative_ttl=5) is None
+    assert cache.get_or_load("x", loader, negative_ttl=5) is None
+    assert calls == ["x"]
+
+    clock.now += 5
+    cache.get_or_load("x", loader, negative_ttl=5)
+    assert calls == ["x", "x"]
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    cache, _ = make_cache(monkeypatch, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stats_count_hits_and_misses(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    "a" in cache            # membership checks don't count
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,108 @@
+"""
+In-memory TTL Cache
+Thread-safe LRU cache with per-entry expiry and hit/miss statistics
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries expire after a time-to-live.
+
+    None is a valid cached value, so failed lookups can be cached too
+    (negative caching) with a shorter TTL via set(..., ttl=...).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple of (found, value)
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return True if key holds an unexpired entry, without touching statistics."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any],
+                    negative_ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value for key, calling loader(key) on a miss.
+
+        Args:
+            key: Cache key
+            loader: Function producing the value for a missing key
+            negative_ttl: TTL for None results (defaults to the cache TTL)
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        value = loader(key)
+        self.set(key, value, ttl=negative_ttl if value is None else None)
+        return value
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def format_stats(self) -> str:
+        """Return a one-line summary of cache statistics."""
+        stats = self.stats()
+        return (f"{self.name}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['size']} cached")